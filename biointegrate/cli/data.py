@@ -11,26 +11,24 @@ datos de forma selectiva desde:
 
 from __future__ import annotations
 
-import argparse
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
-from biointegrate.data.config import AppConfig, load_app_config
-from biointegrate.data.entrypoints.access_gdc import (
-    download_manifest,
-    download_file_metadata,
-    fetch_genes_table,
-    load_gdc_token,
-    run_rnaseq_download_and_gene_extraction,
-)
-from biointegrate.data.entrypoints.access_hgnc import download_hgnc_complete_set
-from biointegrate.data.entrypoints import access_uniprot
-from biointegrate.utils.check_downloaded_filelength import (
-    check_gdc_files,
-    check_hgnc_files,
-    check_uniprot_files,
-)
+from biointegrate.data.config import AppConfig, GDCConfig, load_app_config
+
+# Los módulos de acceso (access_gdc, access_hgnc, access_uniprot) y las
+# utilidades HTTP (que cargan requests) se importan dentro de cada función
+# de descarga: una ejecución con --source concreto solo carga el módulo de
+# esa fuente y --help no carga requests.
+
+if TYPE_CHECKING:
+    import argparse
+
+    import requests
 
 
 logger = logging.getLogger(__name__)
@@ -46,54 +44,156 @@ def configure_logging(level: int = logging.INFO) -> None:
     )
 
 
+def prepare_output_dirs(config: AppConfig, source: str = "all") -> None:
+    """
+    Crea de antemano los directorios de salida de la(s) fuente(s) indicada(s).
+
+    Las rutas ({base_output_dir}/{project_id}/ para GDC y UniProt, y el
+    directorio del fichero de HGNC) se crean en paralelo para solapar la
+    latencia del sistema de ficheros (relevante en NFS o montajes FUSE).
+    Los descargadores siguen creando sus directorios si faltan.
+
+    Parameters
+    ----------
+    config : AppConfig
+        Configuración de la aplicación.
+    source : str
+        Fuente seleccionada en el CLI ("gdc", "hgnc", "uniprot" o "all").
+    """
+    dirs = []
+    if source in ("gdc", "all"):
+        gdc_base = Path(config.gdc.base_output_dir).expanduser().resolve()
+        dirs.extend(gdc_base / pid for pid in config.gdc.project_ids)
+    if source in ("hgnc", "all"):
+        dirs.append(Path(config.hgnc.output_path).expanduser().resolve().parent)
+    if source in ("uniprot", "all") and config.uniprot is not None and config.uniprot.enabled:
+        uniprot_base = Path(config.uniprot.base_output_dir).expanduser().resolve()
+        dirs.extend(uniprot_base / pid for pid in config.gdc.project_ids)
+
+    if not dirs:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(8, len(dirs))) as executor:
+        # list() propaga la primera excepción (p. ej. permisos) al llamador
+        list(executor.map(partial(Path.mkdir, parents=True, exist_ok=True), dirs))
+    logger.debug("Directorios de salida preparados: %d", len(dirs))
+
+
+def _download_gdc_project(
+    gdc_cfg: GDCConfig,
+    project_id: str,
+    token: Optional[str],
+    session: Optional["requests.Session"] = None,
+) -> None:
+    """
+    Descarga manifest, metadatos y datos RNA-seq de un único proyecto GDC.
+    """
+    from biointegrate.data.entrypoints.access_gdc import (
+        download_project_metadata,
+        run_rnaseq_download_and_gene_extraction,
+    )
+
+    logger.info("--- Procesando proyecto: %s ---", project_id)
+
+    # Manifest y metadatos de ficheros en una única petición a /files
+    manifest_path, metadata_path = download_project_metadata(
+        gdc_cfg, project_id, token, session=session
+    )
+    logger.info("Manifest descargado: %s", manifest_path)
+    logger.info("Metadatos descargados: %s", metadata_path)
+
+    # Descarga RNA-seq y extracción de genes para este proyecto
+    run_rnaseq_download_and_gene_extraction(
+        gdc_cfg, project_id, manifest_path, token, session=session
+    )
+
+    logger.info("✓ Proyecto %s procesado correctamente", project_id)
+
+
 def download_gdc_data(config: AppConfig) -> None:
     """
     Descarga todos los datos del GDC según la configuración.
     
     Soporta múltiples proyectos. Para cada proyecto en project_ids:
-    - Descarga manifest
-    - Descarga metadatos de ficheros
+    - Descarga manifest y metadatos de ficheros (en paralelo)
     - Descarga datos RNA-seq y extrae genes
+
+    Los proyectos se procesan en paralelo (hasta gdc.max_parallel_projects
+    a la vez) y la tabla de genes de ejemplo (/genes) se descarga en segundo
+    plano. Un fallo en un proyecto no detiene al resto; al terminar se lanza
+    un error con el resumen de los proyectos fallidos (y de la tabla de
+    genes, si también falla). Todas las peticiones
+    comparten una misma sesión HTTP con pool de conexiones.
     
     Parameters
     ----------
     config : AppConfig
         Configuración de la aplicación que incluye los parámetros de GDC.
+
+    Raises
+    ------
+    RuntimeError
+        Si alguno de los proyectos o la tabla de genes no se pudo descargar.
     """
+    from biointegrate.data.entrypoints.access_gdc import fetch_genes_table, load_gdc_token
+    from biointegrate.utils.http import create_http_session
+
     logger.info("=== Iniciando descarga de datos GDC ===")
     gdc_cfg = config.gdc
     token = load_gdc_token(gdc_cfg.token_path)
     
-    # Descargar tabla general de genes (común a todos los proyectos)
-    try:
+    max_workers = max(1, min(gdc_cfg.max_parallel_projects, len(gdc_cfg.project_ids)))
+    failed_projects: Dict[str, Exception] = {}
+    genes_error: Optional[Exception] = None
+
+    # El pool debe admitir las conexiones simultáneas de todos los hilos,
+    # incluidas las descargas /data en paralelo de cada proyecto
+    pool_maxsize = max(16, max_workers * (gdc_cfg.rnaseq.parallel_downloads + 1) + 1)
+    session = create_http_session(
+        pool_maxsize=pool_maxsize,
+        requests_per_second=gdc_cfg.requests_per_second,
+    )
+
+    with session, ThreadPoolExecutor(max_workers=1) as genes_executor, \
+            ThreadPoolExecutor(max_workers=max_workers) as projects_executor:
+        # Descargar tabla general de genes (común a todos los proyectos)
+        # mientras se procesan los proyectos
         logger.info("Descargando tabla de genes de ejemplo...")
-        fetch_genes_table(gdc_cfg, token)
-    except Exception as e:
-        logger.error(f"Error al descargar tabla de genes: {e}")
-        raise
-    
-    # Procesar cada proyecto
-    for project_id in gdc_cfg.project_ids:
-        logger.info(f"--- Procesando proyecto: {project_id} ---")
+        genes_future = genes_executor.submit(fetch_genes_table, gdc_cfg, token, session=session)
+        
+        # Procesar cada proyecto
+        project_futures = {
+            projects_executor.submit(
+                _download_gdc_project, gdc_cfg, project_id, token, session
+            ): project_id
+            for project_id in gdc_cfg.project_ids
+        }
+        for future in as_completed(project_futures):
+            project_id = project_futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                # Continuar con el resto de proyectos en lugar de abortar todo
+                logger.error("Error al procesar proyecto %s: %s", project_id, e)
+                failed_projects[project_id] = e
+        
         try:
-            # Descargar manifest para este proyecto
-            manifest_path = download_manifest(gdc_cfg, project_id, token)
-            logger.info(f"Manifest descargado: {manifest_path}")
-            
-            # Descargar metadatos de ficheros para este proyecto
-            metadata_path = download_file_metadata(gdc_cfg, project_id, token)
-            logger.info(f"Metadatos descargados: {metadata_path}")
-            
-            # Descarga RNA-seq y extracción de genes para este proyecto
-            run_rnaseq_download_and_gene_extraction(gdc_cfg, project_id, manifest_path, token)
-            
-            logger.info(f"✓ Proyecto {project_id} procesado correctamente")
-            
+            genes_future.result()
         except Exception as e:
-            logger.error(f"Error al procesar proyecto {project_id}: {e}")
-            # Continuar con el siguiente proyecto en lugar de abortar todo
-            continue
+            logger.error("Error al descargar tabla de genes: %s", e)
+            genes_error = e
     
+    errors: List[str] = []
+    if failed_projects:
+        summary = "; ".join(f"{pid}: {err}" for pid, err in failed_projects.items())
+        errors.append(
+            f"Fallaron {len(failed_projects)}/{len(gdc_cfg.project_ids)} proyecto(s) GDC: {summary}"
+        )
+    if genes_error is not None:
+        errors.append(f"Falló la descarga de la tabla de genes: {genes_error}")
+    if errors:
+        raise RuntimeError(". ".join(errors)) from genes_error
+
     logger.info("=== Descarga de GDC completada ===")
     logger.info("Nota: La verificación de archivos se realiza manualmente con check_gdc_files")
 
@@ -107,9 +207,14 @@ def download_hgnc_data(config: AppConfig) -> None:
     config : AppConfig
         Configuración de la aplicación que incluye los parámetros de HGNC.
     """
+    from biointegrate.data.entrypoints.access_hgnc import download_hgnc_complete_set
+    from biointegrate.utils.check_downloaded_filelength import check_hgnc_files
+    from biointegrate.utils.http import create_http_session
+
     logger.info("=== Iniciando descarga de datos HGNC ===")
     try:
-        download_hgnc_complete_set(config.hgnc)
+        with create_http_session() as session:
+            download_hgnc_complete_set(config.hgnc, session=session)
         
         # Verificar archivo descargado
         logger.info("Verificando archivo descargado...")
@@ -117,7 +222,7 @@ def download_hgnc_data(config: AppConfig) -> None:
         
         logger.info("=== Descarga de HGNC completada exitosamente ===")
     except Exception as e:
-        logger.error(f"Error al descargar datos de HGNC: {e}")
+        logger.error("Error al descargar datos de HGNC: %s", e)
         raise
 
 
@@ -134,6 +239,9 @@ def download_uniprot_data(config: AppConfig) -> None:
     config : AppConfig
         Configuración de la aplicación que incluye los parámetros de UniProt.
     """
+    from biointegrate.data.entrypoints import access_uniprot
+    from biointegrate.utils.http import create_http_session
+
     logger.info("=== Iniciando descarga de datos UniProt ===")
     
     if config.uniprot is None:
@@ -150,61 +258,94 @@ def download_uniprot_data(config: AppConfig) -> None:
     
     try:
         # Llamar a la función run() del módulo access_uniprot
-        access_uniprot.run(config)
+        # Sin reintentos en el adaptador: access_uniprot gestiona los suyos
+        with create_http_session(
+            pool_connections=1,
+            pool_maxsize=max(1, config.uniprot.max_concurrency),
+            max_retries=0,
+        ) as session:
+            access_uniprot.run(config, session=session)
         
         logger.info("=== Descarga de UniProt completada exitosamente ===")
         logger.info("Nota: Los archivos se organizan por proyecto en %s/{project_id}/", config.uniprot.base_output_dir)
     except FileNotFoundError as e:
-        logger.error(f"Faltan archivos requeridos: {e}")
+        logger.error("Faltan archivos requeridos: %s", e)
         logger.error("Sugerencia: ejecute primero 'datastandards-download --source gdc' y '--source hgnc'")
         logger.error("O ejecute 'datastandards-download --source all' para descargar todo en orden")
         raise
     except Exception as e:
-        logger.error(f"Error al descargar datos de UniProt: {e}")
+        logger.error("Error al descargar datos de UniProt: %s", e)
         raise
 
 
 def download_all_data(config: AppConfig) -> None:
     """
     Descarga datos de todas las fuentes disponibles.
+
+    GDC y HGNC son independientes entre sí y se descargan en paralelo;
+    UniProt se lanza después porque necesita los ficheros de ambas fuentes.
     
     Parameters
     ----------
     config : AppConfig
         Configuración de la aplicación con todos los parámetros.
+
+    Raises
+    ------
+    RuntimeError
+        Si alguna fuente falla. Las demás fuentes se intentan igualmente y
+        el mensaje resume todos los errores.
     """
     logger.info("=== Iniciando descarga de TODAS las fuentes ===")
+    errors: List[Tuple[str, BaseException]] = []
     
-    # Descargar GDC
-    try:
-        download_gdc_data(config)
-    except Exception as e:
-        logger.error(f"Error en GDC, continuando con otras fuentes...")
-    
-    # Descargar HGNC
-    try:
-        download_hgnc_data(config)
-    except Exception as e:
-        logger.error(f"Error en HGNC, continuando con otras fuentes...")
+    # Descargar GDC y HGNC en paralelo (ambas limitadas por red)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {
+            executor.submit(download_gdc_data, config): "GDC",
+            executor.submit(download_hgnc_data, config): "HGNC",
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                errors.append((futures[future], e))
+                logger.exception("Error en %s, continuando con otras fuentes...", futures[future])
     
-    # Descargar UniProt
+    # Descargar UniProt (depende de GDC y HGNC)
     try:
         download_uniprot_data(config)
     except Exception as e:
-        logger.error(f"Error en UniProt, continuando con otras fuentes...")
+        errors.append(("UniProt", e))
+        logger.exception("Error en %s, continuando con otras fuentes...", "UniProt")
     
+    if errors:
+        summary = "; ".join(f"{source}: {err}" for source, err in errors)
+        logger.error("Fuentes con errores (%d/3): %s", len(errors), summary)
+        raise RuntimeError(f"Fallaron {len(errors)}/3 fuente(s): {summary}")
+
     logger.info("=== Proceso de descarga completo ===")
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     """
     Parsea los argumentos de línea de comandos.
+
+    argparse se importa aquí para no penalizar el arranque de los módulos
+    que solo importan las funciones de descarga (p. ej. el pipeline).
+
+    Parameters
+    ----------
+    argv : Sequence[str], optional
+        Argumentos a parsear; por defecto se usa sys.argv[1:].
     
     Returns
     -------
     argparse.Namespace
         Argumentos parseados.
     """
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Descarga datos biomédicos de diferentes fuentes (GDC, HGNC, UniProt).",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -239,7 +380,7 @@ Ejemplos de uso:
         help="Activar modo verbose (nivel DEBUG de logging).",
     )
     
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def main() -> None:
@@ -257,18 +398,20 @@ def main() -> None:
     # Cargar configuración
     config_path = Path(args.config).expanduser().resolve()
     if not config_path.exists():
-        logger.error(f"El fichero de configuración no existe: {config_path}")
+        logger.error("El fichero de configuración no existe: %s", config_path)
         sys.exit(1)
     
-    logger.info(f"Cargando configuración desde: {config_path}")
+    logger.info("Cargando configuración desde: %s", config_path)
     try:
         config = load_app_config(config_path)
     except Exception as e:
-        logger.error(f"Error al cargar la configuración: {e}")
+        logger.error("Error al cargar la configuración: %s", e)
         sys.exit(1)
     
     # Ejecutar descarga según la fuente seleccionada
     try:
+        prepare_output_dirs(config, args.source)
+
         if args.source == "gdc":
             download_gdc_data(config)
         elif args.source == "hgnc":
@@ -278,7 +421,7 @@ def main() -> None:
         elif args.source == "all":
             download_all_data(config)
         else:
-            logger.error(f"Fuente no reconocida: {args.source}")
+            logger.error("Fuente no reconocida: %s", args.source)
             sys.exit(1)
             
         logger.info("✓ Proceso completado exitosamente")
@@ -287,7 +430,7 @@ def main() -> None:
         logger.warning("Proceso interrumpido por el usuario")
         sys.exit(130)
     except Exception as e:
-        logger.error(f"Error fatal: {e}", exc_info=True)
+        logger.error("Error fatal: %s", e, exc_info=True)
         sys.exit(1)
 
 
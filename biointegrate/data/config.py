@@ -7,14 +7,22 @@ y carga desde un fichero YAML.
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+import copy
+import functools
+import json
+import logging
+import os
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import yaml
+# PyYAML se importa al parsear el primer fichero (ver _yaml_loader): importar
+# este módulo (p. ej. para --help o para las dataclasses) no lo carga.
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+
+@dataclass(frozen=True)
 class RnaSeqConfig:
     """Configuración específica para descargas RNA-seq (STAR-Counts) desde GDC."""
 
@@ -24,18 +32,32 @@ class RnaSeqConfig:
     decompress_downloads: bool = False
     gene_id_column_index: int = 0
     strip_version: bool = True
+    # Descargas simultáneas desde /data por proyecto
+    parallel_downloads: int = 8
+    # Construir la tabla de genes con la unión de todos los ficheros
+    # descargados (en paralelo) y avisar si difieren, en lugar de usar solo el primero
+    verify_across_files: bool = False
 
 
-@dataclass
+def _split_fields(raw: str) -> Tuple[str, ...]:
+    """
+    Separa una lista de campos por comas, eliminando espacios y saltos de
+    línea (los bloques plegados '>' del YAML los introducen) y entradas vacías.
+    """
+    return tuple(part.strip() for part in raw.split(",") if part.strip())
+
+
+@dataclass(frozen=True)
 class GDCConfig:
     """Configuración específica para acceso al GDC.
 
-    Multi-project support: project_ids is a list of project IDs to download.
+    Multi-project support: project_ids is a tuple of project IDs to download
+    (the YAML list is converted at load time, keeping the dataclass hashable).
     Output files will be organized in: {base_output_dir}/{project_id}/
     """
 
     base_url: str
-    project_ids: List[str]  # Changed from project_id to support multiple projects
+    project_ids: Tuple[str, ...]  # Changed from project_id to support multiple projects
     data_category: str
     data_type: str
     workflow_type: str
@@ -50,19 +72,55 @@ class GDCConfig:
     # Metadatos fichero–caso–muestra
     file_metadata_fields: str
 
-    # Tabla de genes de ejemplo vía /genes
-    gene_symbols: List[str]
+    # Tabla de genes de ejemplo vía /genes (sin duplicados, orden del YAML)
+    gene_symbols: Tuple[str, ...]
 
     # Parámetros generales de la API
     page_size: int = 10000
     token_path: Optional[str] = None
     request_timeout: int = 120
 
+    # Número máximo de proyectos descargados en paralelo
+    max_parallel_projects: int = 4
+
+    # Ruta de la tabla de genes de ejemplo (por defecto en base_output_dir)
+    genes_output: Optional[str] = None
+
+    # Caché en disco de respuestas de /files (desactivada si cache_dir es None)
+    cache_dir: Optional[str] = None
+    cache_ttl_seconds: int = 86400
+
+    # Límite de peticiones por segundo a la API (None = sin límite)
+    requests_per_second: Optional[float] = None
+
     # Nueva subconfiguración RNA-seq
     rnaseq: RnaSeqConfig = field(default_factory=RnaSeqConfig)
 
+    # Campos derivados (calculados una vez en __post_init__): listas de
+    # campos ya separadas y cadena normalizada para el parámetro 'fields'
+    fields_tuple: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    fields_param: str = field(init=False, repr=False, compare=False)
+    file_metadata_fields_tuple: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+    file_metadata_fields_param: str = field(init=False, repr=False, compare=False)
 
-@dataclass
+    # URLs de los endpoints de la API (derivadas de base_url)
+    files_url: str = field(init=False, repr=False, compare=False)
+    genes_url: str = field(init=False, repr=False, compare=False)
+    data_url: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # object.__setattr__ porque la dataclass es frozen
+        for name in ("fields", "file_metadata_fields"):
+            parsed = _split_fields(getattr(self, name))
+            object.__setattr__(self, f"{name}_tuple", parsed)
+            object.__setattr__(self, f"{name}_param", ",".join(parsed))
+
+        base_url = self.base_url.rstrip("/")
+        for endpoint in ("files", "genes", "data"):
+            object.__setattr__(self, f"{endpoint}_url", f"{base_url}/{endpoint}")
+
+
+@dataclass(frozen=True)
 class HGNCConfig:
     """Configuración específica para descarga del conjunto completo de HGNC."""
 
@@ -71,7 +129,7 @@ class HGNCConfig:
     request_timeout: int = 60
 
 
-@dataclass
+@dataclass(frozen=True)
 class UniProtConfig:
     """Configuración específica para descarga de datos de UniProt.
 
@@ -82,8 +140,13 @@ class UniProtConfig:
     # Activación/desactivación del módulo UniProt
     enabled: bool = True
 
-    # Endpoint base de UniProtKB (búsquedas)
+    # Endpoint base de UniProtKB (búsquedas). También admite
+    # .../uniprotkb/accessions (búsqueda directa por acceso)
     base_url: str = "https://rest.uniprot.org/uniprotkb/search"
+    # Descargar con el servicio ID Mapping (un trabajo + una descarga en
+    # streaming) en lugar de lotes contra /uniprotkb/search
+    use_idmapping: bool = False
+    idmapping_url: str = "https://rest.uniprot.org/idmapping"
 
     # Parámetros biológicos
     organism_id: int = 9606
@@ -102,10 +165,21 @@ class UniProtConfig:
     batch_size: int = 200
     max_retries: int = 3
     timeout: int = 60
+    # Espera base entre reintentos de un lote (backoff exponencial con jitter
+    # si el servidor no envía Retry-After)
     sleep_between: float = 0.34
+    # Lotes pedidos a la vez
+    max_concurrency: int = 4
+    # Límite de peticiones por minuto compartido entre lotes (leaky bucket)
+    max_requests_per_minute: int = 180
+    # Caché en disco de respuestas por lote (desactivada si cache_dir es None)
+    cache_dir: Optional[str] = None
+    cache_ttl_seconds: int = 30 * 86400
 
     # Control del tamaño del dataset (None = sin límite)
     max_accessions: Optional[int] = None
+    # Filtrar HGNC en varios procesos (solo útil con ficheros muy grandes)
+    parallel_parse: bool = False
 
     # Base output directory for UniProt data
     # Project-specific subdirectories will be created as: {base_output_dir}/{project_id}/
@@ -253,7 +327,7 @@ class HGNCMongoAppConfig:
     options: HGNCMongoOptionsConfig = field(default_factory=HGNCMongoOptionsConfig)
 
 
-@dataclass
+@dataclass(frozen=True)
 class AppConfig:
     """Configuración completa de la aplicación (GDC + HGNC + UniProt)."""
 
@@ -261,10 +335,145 @@ class AppConfig:
     hgnc: HGNCConfig
     uniprot: Optional[UniProtConfig] = None
 
-def _load_yaml(path: Path) -> Dict[str, Any]:
-    """Carga un fichero YAML y devuelve su contenido como diccionario."""
+# Activa la caché JSON en disco junto a cada YAML (desactivada por defecto)
+_YAML_SIDECAR_ENV = "BIOINTEGRATE_YAML_CACHE"
+
+
+@functools.lru_cache(maxsize=None)
+def _yaml_loader() -> type:
+    """
+    Importa PyYAML bajo demanda y devuelve el cargador a usar: CSafeLoader
+    (LibYAML, en C) si está disponible o SafeLoader en caso contrario.
+    """
+    try:
+        from yaml import CSafeLoader as loader
+    except ImportError:  # PyYAML compilado sin LibYAML
+        from yaml import SafeLoader as loader  # type: ignore[assignment]
+    return loader
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_yaml_cached(path_str: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """
+    Parsea un fichero YAML y memoriza el resultado.
+
+    La clave incluye mtime y tamaño del fichero, de modo que cualquier
+    modificación en disco invalida la entrada automáticamente.
+
+    Si la variable de entorno BIOINTEGRATE_YAML_CACHE=1 está definida, se
+    mantiene además un fichero JSON junto al YAML (``<fichero>.yaml.cache.json``)
+    que se reutiliza mientras no sea más antiguo que el YAML original.
+    """
+    path = Path(path_str)
+    use_sidecar = os.environ.get(_YAML_SIDECAR_ENV) == "1"
+    sidecar_path = path.with_suffix(path.suffix + ".cache.json")
+
+    if use_sidecar:
+        try:
+            if sidecar_path.stat().st_mtime_ns >= mtime_ns:
+                return json.loads(sidecar_path.read_bytes())
+        except (OSError, ValueError):
+            pass
+
+    import yaml
+
     with path.open("r", encoding="utf-8") as fh:
-        return yaml.safe_load(fh)
+        raw = yaml.load(fh, Loader=_yaml_loader())
+
+    if use_sidecar:
+        try:
+            sidecar_path.write_text(json.dumps(raw, default=str), encoding="utf-8")
+        except OSError:
+            # El directorio puede ser de solo lectura; la caché es opcional
+            pass
+
+    return raw
+
+
+def _resolve_config_path(config_path: str | Path) -> Path:
+    """Normaliza la ruta del fichero de configuración.
+
+    Si ya se recibe un Path absoluto (p. ej. resuelto por el CLI) se
+    devuelve tal cual, evitando repetir expanduser().resolve() y sus
+    llamadas al sistema de ficheros.
+    """
+    if isinstance(config_path, Path) and config_path.is_absolute():
+        return config_path
+    return Path(config_path).expanduser().resolve()
+
+
+def _load_yaml(path: Path) -> Dict[str, Any]:
+    """Carga un fichero YAML y devuelve su contenido como diccionario.
+
+    Usa el cargador en C de LibYAML (CSafeLoader) cuando está disponible;
+    en caso contrario recurre al SafeLoader puro de Python. El resultado
+    se cachea por (ruta, mtime, tamaño) y se devuelve una copia para que
+    los llamadores no puedan alterar la entrada cacheada.
+    """
+    st = path.stat()
+    raw = _parse_yaml_cached(str(path), st.st_mtime_ns, st.st_size)
+    return copy.deepcopy(raw)
+
+
+def clear_yaml_cache() -> None:
+    """Vacía la caché de ficheros YAML parseados."""
+    _parse_yaml_cached.cache_clear()
+
+
+def _dataclass_kwargs(cls: type, raw: Dict[str, Any], section: str) -> Dict[str, Any]:
+    """
+    Filtra un diccionario del YAML dejando solo las claves que son campos
+    (inicializables) de la dataclass indicada.
+
+    Las claves desconocidas (p. ej. de versiones antiguas del formato) se
+    ignoran con un aviso en lugar de provocar un TypeError en el constructor.
+    """
+    valid = {f.name for f in fields(cls) if f.init}
+    unknown = [key for key in raw if key not in valid]
+    if unknown:
+        logger.warning(
+            "Claves desconocidas ignoradas en la sección '%s': %s",
+            section,
+            ", ".join(sorted(unknown)),
+        )
+    return {key: value for key, value in raw.items() if key in valid}
+
+
+_GDC_REQUIRED_KEYS = (
+    "base_url",
+    "project_ids",
+    "data_category",
+    "data_type",
+    "workflow_type",
+    "base_output_dir",
+    "fields",
+    "file_metadata_fields",
+)
+_HGNC_REQUIRED_KEYS = ("url", "output_path")
+
+
+def _validate_app_config_raw(
+    gdc_raw: Dict[str, Any], hgnc_raw: Dict[str, Any], path: Path
+) -> None:
+    """
+    Comprueba las claves obligatorias de las secciones 'gdc' y 'hgnc'.
+
+    Se recogen todos los problemas antes de fallar, de modo que un único
+    ValueError enumera cada clave ausente o inválida (en lugar del KeyError
+    de la primera clave que falte).
+    """
+    problems = [f"gdc.{key}" for key in _GDC_REQUIRED_KEYS if key not in gdc_raw]
+    problems += [f"hgnc.{key}" for key in _HGNC_REQUIRED_KEYS if key not in hgnc_raw]
+
+    project_ids = gdc_raw.get("project_ids")
+    if project_ids is not None and not isinstance(project_ids, list):
+        problems.append("gdc.project_ids (debe ser una lista)")
+
+    if problems:
+        raise ValueError(
+            f"Configuración inválida en {path}; claves ausentes o inválidas: "
+            + ", ".join(problems)
+        )
 
 
 def load_app_config(config_path: str | Path) -> AppConfig:
@@ -273,31 +482,39 @@ def load_app_config(config_path: str | Path) -> AppConfig:
     las dataclasses AppConfig, GDCConfig, HGNCConfig, UniProtConfig y RnaSeqConfig.
 
     Multi-project support: Expects project_ids as a list in the YAML config.
+
+    Raises ValueError listando todas las claves obligatorias ausentes.
     """
-    path = Path(config_path).expanduser().resolve()
+    path = _resolve_config_path(config_path)
     raw: Dict[str, Any] = _load_yaml(path)
 
     gdc_raw: Dict[str, Any] = raw.get("gdc", {})
     hgnc_raw: Dict[str, Any] = raw.get("hgnc", {})
     uniprot_raw: Dict[str, Any] = raw.get("uniprot", {})
+    _validate_app_config_raw(gdc_raw, hgnc_raw, path)
 
     rnaseq_raw: Dict[str, Any] = gdc_raw.get("rnaseq", {})
-    rnaseq_cfg = RnaSeqConfig(**rnaseq_raw)
+    rnaseq_cfg = RnaSeqConfig(**_dataclass_kwargs(RnaSeqConfig, rnaseq_raw, "gdc.rnaseq"))
 
     # Extraemos explícitamente las claves de GDC, dejando fuera 'rnaseq'
     gdc_cfg = GDCConfig(
         base_url=gdc_raw["base_url"],
-        project_ids=gdc_raw["project_ids"],  # Changed to project_ids (list)
+        project_ids=tuple(gdc_raw["project_ids"]),  # Changed to project_ids (list in the YAML)
         data_category=gdc_raw["data_category"],
         data_type=gdc_raw["data_type"],
         workflow_type=gdc_raw["workflow_type"],
         base_output_dir=gdc_raw["base_output_dir"],  # Changed to base_output_dir
         fields=gdc_raw["fields"],
         file_metadata_fields=gdc_raw["file_metadata_fields"],
-        gene_symbols=gdc_raw.get("gene_symbols", []),
+        gene_symbols=tuple(dict.fromkeys(gdc_raw.get("gene_symbols") or ())),
         page_size=gdc_raw.get("page_size", 10000),
         token_path=gdc_raw.get("token_path"),
         request_timeout=gdc_raw.get("request_timeout", 120),
+        max_parallel_projects=gdc_raw.get("max_parallel_projects", 4),
+        genes_output=gdc_raw.get("genes_output"),
+        cache_dir=gdc_raw.get("cache_dir"),
+        cache_ttl_seconds=gdc_raw.get("cache_ttl_seconds", 86400),
+        requests_per_second=gdc_raw.get("requests_per_second"),
         rnaseq=rnaseq_cfg,
     )
 
@@ -307,40 +524,40 @@ def load_app_config(config_path: str | Path) -> AppConfig:
         request_timeout=hgnc_raw.get("request_timeout", 60),
     )
 
-    uniprot_cfg = UniProtConfig(**uniprot_raw) if uniprot_raw else None
+    uniprot_cfg = (
+        UniProtConfig(**_dataclass_kwargs(UniProtConfig, uniprot_raw, "uniprot"))
+        if uniprot_raw
+        else None
+    )
 
     return AppConfig(gdc=gdc_cfg, hgnc=hgnc_cfg, uniprot=uniprot_cfg)
 
 
-def load_gdc_mongo_config(config_path: str | Path) -> GDCMongoAppConfig:
+def _build_mongodb_config(
+    mongodb_raw: Dict[str, Any], collection_name: Optional[str] = None
+) -> MongoDBConfig:
     """
-    Carga la configuración de importación GDC a MongoDB desde un fichero YAML
-    y construye las dataclasses correspondientes.
+    Construye MongoDBConfig a partir de la sección 'mongodb' del YAML.
 
-    Multi-project support: Parses projects list from YAML and creates
-    ProjectMetadata objects for each project.
+    Solo se leen las claves que acepta la dataclass; si se indica
+    collection_name, sustituye al valor del YAML.
     """
-    path = Path(config_path).expanduser().resolve()
-    raw: Dict[str, Any] = _load_yaml(path)
-
-    # Cargar configuración MongoDB
-    mongodb_raw: Dict[str, Any] = raw.get("mongodb", {})
-    # Create MongoDBConfig with only the fields it accepts
-    mongodb_cfg = MongoDBConfig(
+    return MongoDBConfig(
         mongo_uri=mongodb_raw.get("mongo_uri", "mongodb://localhost:27017/"),
         database_name=mongodb_raw.get("database_name", "estandares_db"),
-        collection_name=mongodb_raw.get("collection_name", "gdc_cases")
+        collection_name=collection_name or mongodb_raw.get("collection_name", "gdc_cases"),
     )
 
-    # Cargar configuración de datos GDC
-    gdc_raw: Dict[str, Any] = raw.get("gdc", {})
 
-    # Parse projects list
+def _build_gdc_mongo_data_config(gdc_raw: Dict[str, Any]) -> GDCMongoDataConfig:
+    """
+    Construye GDCMongoDataConfig (con su lista de proyectos) a partir de la
+    sección 'gdc' del YAML de MongoDB.
+    """
     projects_raw: List[Dict[str, Any]] = gdc_raw.get("projects", [])
     projects = [ProjectMetadata(**proj) for proj in projects_raw]
 
-    # Create GDCMongoDataConfig with parsed projects
-    gdc_cfg = GDCMongoDataConfig(
+    return GDCMongoDataConfig(
         base_data_dir=gdc_raw["base_data_dir"],
         projects=projects,
         manifest_filename=gdc_raw.get("manifest_filename", "gdc_manifest_{project_id_lower}.tsv"),
@@ -349,6 +566,25 @@ def load_gdc_mongo_config(config_path: str | Path) -> GDCMongoAppConfig:
         star_counts_dirname=gdc_raw.get("star_counts_dirname", "star_counts"),
     )
 
+
+def load_gdc_mongo_config(config_path: str | Path) -> GDCMongoAppConfig:
+    """
+    Carga la configuración de importación GDC a MongoDB desde un fichero YAML
+    y construye las dataclasses correspondientes.
+
+    Multi-project support: Parses projects list from YAML and creates
+    ProjectMetadata objects for each project.
+    """
+    path = _resolve_config_path(config_path)
+    raw: Dict[str, Any] = _load_yaml(path)
+
+    # Cargar configuración MongoDB
+    mongodb_cfg = _build_mongodb_config(raw.get("mongodb", {}))
+
+    # Cargar configuración de datos GDC
+    gdc_raw: Dict[str, Any] = raw.get("gdc", {})
+    gdc_cfg = _build_gdc_mongo_data_config(gdc_raw)
+
     # Cargar opciones (only GDC-relevant ones)
     options_raw: Dict[str, Any] = raw.get("options", {})
     gdc_options = {
@@ -372,7 +608,7 @@ def load_hgnc_mongo_config(config_path: str | Path) -> HGNCMongoAppConfig:
 
     Integrates HGNC gene data with GDC expression data for all configured projects.
     """
-    path = Path(config_path).expanduser().resolve()
+    path = _resolve_config_path(config_path)
     raw: Dict[str, Any] = _load_yaml(path)
 
     # Cargar configuración MongoDB
@@ -381,12 +617,7 @@ def load_hgnc_mongo_config(config_path: str | Path) -> HGNCMongoAppConfig:
     # Extract hgnc_collection_name before creating MongoDBConfig
     hgnc_collection_name = mongodb_raw.get("hgnc_collection_name", "hgnc_genes")
 
-    # Create MongoDBConfig with only the fields it accepts
-    mongodb_cfg = MongoDBConfig(
-        mongo_uri=mongodb_raw.get("mongo_uri", "mongodb://localhost:27017/"),
-        database_name=mongodb_raw.get("database_name", "estandares_db"),
-        collection_name=mongodb_raw.get("collection_name", "gdc_cases")
-    )
+    mongodb_cfg = _build_mongodb_config(mongodb_raw)
 
     # Cargar configuración HGNC
     hgnc_raw: Dict[str, Any] = raw.get("hgnc", {})
@@ -397,20 +628,7 @@ def load_hgnc_mongo_config(config_path: str | Path) -> HGNCMongoAppConfig:
 
     # Cargar configuración de datos GDC (reutilizamos la misma estructura)
     gdc_raw: Dict[str, Any] = raw.get("gdc", {})
-
-    # Parse projects list
-    projects_raw: List[Dict[str, Any]] = gdc_raw.get("projects", [])
-    projects = [ProjectMetadata(**proj) for proj in projects_raw]
-
-    # Create GDCMongoDataConfig with parsed projects
-    gdc_cfg = GDCMongoDataConfig(
-        base_data_dir=gdc_raw["base_data_dir"],
-        projects=projects,
-        manifest_filename=gdc_raw.get("manifest_filename", "gdc_manifest_{project_id_lower}.tsv"),
-        metadata_filename=gdc_raw.get("metadata_filename", "gdc_file_metadata_{project_id_lower}.tsv"),
-        genes_filename=gdc_raw.get("genes_filename", "gdc_genes_{project_id_lower}.tsv"),
-        star_counts_dirname=gdc_raw.get("star_counts_dirname", "star_counts"),
-    )
+    gdc_cfg = _build_gdc_mongo_data_config(gdc_raw)
 
     # Cargar opciones
     options_raw: Dict[str, Any] = raw.get("options", {})
@@ -432,16 +650,12 @@ def load_uniprot_mongo_config(config_path: str | Path) -> UniProtMongoAppConfig:
     Multi-project support: Parses projects list from YAML and creates
     UniProtProjectMetadata objects for each project.
     """
-    path = Path(config_path).expanduser().resolve()
+    path = _resolve_config_path(config_path)
     raw: Dict[str, Any] = _load_yaml(path)
 
-    # Cargar configuración MongoDB
-    mongodb_raw: Dict[str, Any] = raw.get("mongodb", {})
-    # Create MongoDBConfig with only the fields it accepts
-    mongodb_cfg = MongoDBConfig(
-        mongo_uri=mongodb_raw.get("mongo_uri", "mongodb://localhost:27017/"),
-        database_name=mongodb_raw.get("database_name", "estandares_db"),
-        collection_name="uniprot_entries"  # Override for UniProt
+    # Cargar configuración MongoDB (colección fija para UniProt)
+    mongodb_cfg = _build_mongodb_config(
+        raw.get("mongodb", {}), collection_name="uniprot_entries"
     )
 
     # Cargar configuración de datos UniProt
@@ -518,7 +732,9 @@ def load_query_config(config_path: str | Path) -> QueryAppConfig:
         ValueError: If YAML is invalid or missing required fields
         yaml.YAMLError: If YAML parsing fails
     """
-    path = Path(config_path).expanduser().resolve()
+    import yaml
+
+    path = _resolve_config_path(config_path)
 
     if not path.exists():
         raise FileNotFoundError(f"Config file not found: {path}")
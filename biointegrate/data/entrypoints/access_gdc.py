@@ -17,21 +17,68 @@ Requiere:
 
 from __future__ import annotations
 
+import contextlib
 import csv
+import functools
 import gzip
+import hashlib
+import itertools
 import json
 import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+)
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence
-
-import requests
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 from biointegrate.data.config import AppConfig, GDCConfig, load_app_config
+from biointegrate.utils.json_io import dumps_json_compact, loads_json
+
+try:
+    # python-isal (extra opcional 'speedups'): misma API que gzip con un
+    # inflado ~2x más rápido; descomprime los .gz de STAR-Counts
+    from isal import igzip as _gzip
+except ImportError:
+    _gzip = gzip  # type: ignore[assignment]
+
+# requests (y biointegrate.utils.http, que lo importa) se cargan al crear la
+# primera sesión HTTP: importar este módulo no paga ese coste.
+if TYPE_CHECKING:
+    import requests
 
 
 logger = logging.getLogger(__name__)
 
+# La sesión HTTP compartida (pool keep-alive + reintentos) se usa cuando el
+# llamador no proporciona una propia; vive en biointegrate.utils.http para
+# que HGNC y UniProt reutilicen el mismo pool.
+def _get_session() -> requests.Session:
+    """Devuelve la sesión HTTP compartida del proceso, creándola si no existe."""
+    from biointegrate.utils.http import get_shared_session
+
+    return get_shared_session()
+
 
 @dataclass
 class SelectedFile:
@@ -49,19 +96,16 @@ def setup_logging() -> None:
     )
 
 
-def build_gdc_files_filters(gdc_cfg: GDCConfig, project_id: str) -> Dict[str, Any]:
+@functools.lru_cache(maxsize=8)
+def _gdc_files_filters_json(
+    project_id: str,
+    data_category: str,
+    data_type: str,
+    workflow_type: Optional[str],
+) -> str:
     """
-    Construye el diccionario de filtros para el endpoint /files del GDC.
-
-    Los filtros restringen:
-        - Proyecto (cases.project.project_id)
-        - Data Category (data_category)
-        - Data Type (data_type)
-        - Workflow (analysis.workflow_type), si está configurado.
-
-    Args:
-        gdc_cfg: Configuración GDC
-        project_id: ID del proyecto específico para filtrar (e.g., "TCGA-LGG")
+    Serializa (una sola vez por combinación de parámetros) los filtros de
+    /files a una cadena JSON estable con claves ordenadas.
     """
     filters: Dict[str, Any] = {
         "op": "and",
@@ -77,31 +121,282 @@ def build_gdc_files_filters(gdc_cfg: GDCConfig, project_id: str) -> Dict[str, An
                 "op": "in",
                 "content": {
                     "field": "data_category",
-                    "value": [gdc_cfg.data_category],
+                    "value": [data_category],
                 },
             },
             {
                 "op": "in",
                 "content": {
                     "field": "data_type",
-                    "value": [gdc_cfg.data_type],
+                    "value": [data_type],
                 },
             },
         ],
     }
 
-    if gdc_cfg.workflow_type:
+    if workflow_type:
         filters["content"].append(
             {
                 "op": "in",
                 "content": {
                     "field": "analysis.workflow_type",
-                    "value": [gdc_cfg.workflow_type],
+                    "value": [workflow_type],
                 },
             }
         )
 
-    return filters
+    return json.dumps(filters, sort_keys=True)
+
+
+def build_gdc_files_filters(gdc_cfg: GDCConfig, project_id: str) -> Dict[str, Any]:
+    """
+    Construye el diccionario de filtros para el endpoint /files del GDC.
+
+    Los filtros restringen:
+        - Proyecto (cases.project.project_id)
+        - Data Category (data_category)
+        - Data Type (data_type)
+        - Workflow (analysis.workflow_type), si está configurado.
+
+    La construcción se memoiza en _gdc_files_filters_json; cada llamada
+    devuelve un diccionario nuevo, por lo que el llamador puede modificarlo.
+
+    Args:
+        gdc_cfg: Configuración GDC
+        project_id: ID del proyecto específico para filtrar (e.g., "TCGA-LGG")
+    """
+    return loads_json(
+        _gdc_files_filters_json(
+            project_id,
+            gdc_cfg.data_category,
+            gdc_cfg.data_type,
+            gdc_cfg.workflow_type or None,
+        )
+    )
+
+
+# Tamaño de bloque al volcar respuestas de /files a disco
+_FILES_CHUNK = 1 << 16
+
+# Tamaño de bloque para descargas /data y descompresión (mismo valor que
+# biointegrate.utils.http.STREAM_CHUNK_SIZE, que aquí no se importa para no
+# cargar requests al importar el módulo)
+_DATA_CHUNK = 1 << 20
+
+
+class _GdcPage:
+    """
+    Una página de resultados de /files leída en streaming.
+
+    iter_bytes() entrega el cuerpo en bloques de _FILES_CHUNK sin cargarlo
+    entero en memoria y cuenta las líneas recibidas (n_lines), que
+    _iter_gdc_files_pages usa para decidir si pedir la página siguiente.
+    """
+
+    def __init__(self, response: requests.Response, fmt: str) -> None:
+        self.response = response
+        self.n_lines = 0
+        self.is_tsv = fmt.upper() == "TSV"
+        self._consumed = False
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        """
+        Recorre el cuerpo una sola vez (cabecera incluida). En TSV garantiza
+        el salto de línea final.
+        """
+        if self._consumed:
+            return
+        self._consumed = True
+        last = b""
+        try:
+            for chunk in self.response.iter_content(chunk_size=_FILES_CHUNK):
+                if not chunk:
+                    continue
+                self.n_lines += chunk.count(b"\n")
+                last = chunk
+                yield chunk
+        finally:
+            self.response.close()
+        if last and not last.endswith(b"\n"):
+            self.n_lines += 1
+            if self.is_tsv:
+                yield b"\n"
+
+    def drain(self) -> None:
+        """Consume lo que quede del cuerpo (para contar líneas y liberar la conexión)."""
+        for _ in self.iter_bytes():
+            pass
+
+
+def _iter_gdc_files_pages(
+    endpoint: str,
+    filters: Dict[str, Any],
+    fields: str,
+    page_size: int,
+    token: Optional[str],
+    timeout: int,
+    fmt: str = "TSV",
+    session: Optional[requests.Session] = None,
+    conditional_headers: Optional[Dict[str, str]] = None,
+) -> Iterator[_GdcPage]:
+    """
+    Recorre los resultados de /files página a página (parámetros from/size).
+
+    Cada página se entrega al llamador antes de pedir la siguiente y su
+    cuerpo se lee en streaming, de modo que en memoria solo hay un bloque.
+    En TSV se sigue paginando mientras una página venga completa
+    (page_size filas); en JSON se hace una única petición.
+
+    conditional_headers (If-None-Match, ...) se añaden solo a la primera
+    página; si el servidor responde 304 se entrega esa respuesta y se para.
+    """
+    http = session if session is not None else _get_session()
+    offset = 0
+    while True:
+        body, headers = _gdc_files_request(filters, fields, page_size, token, fmt, offset=offset)
+        if conditional_headers and offset == 0:
+            headers.update(conditional_headers)
+
+        response = http.post(endpoint, data=body, headers=headers, timeout=timeout, stream=True)
+        if response.status_code == 304 and offset == 0:
+            response.close()
+            yield _GdcPage(response, fmt)
+            return
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        page = _GdcPage(response, fmt)
+        yield page
+
+        if fmt.upper() != "TSV":
+            page.drain()
+            return
+        page.drain()  # por si el llamador no leyó el cuerpo completo
+        n_rows = max(0, page.n_lines - 1)  # sin cabecera
+        if n_rows < page_size:
+            return
+        offset += page_size
+        logger.info("GDC /files: página completa (%d filas); pidiendo desde %d", n_rows, offset)
+
+
+def _page_bodies(pages: Iterable[_GdcPage]) -> Iterator[bytes]:
+    """
+    Convierte las páginas de /files en bloques de un único documento.
+
+    En TSV cada página trae su propia cabecera, y el GDC aplana los campos
+    anidados (p. ej. 'cases.0.samples.N.*') según el máximo anidamiento de
+    esa página, así que dos páginas pueden tener columnas distintas. Las
+    páginas se vuelcan a un temporal y el documento se emite con la unión
+    de las columnas (las de la primera página y, a continuación, las nuevas
+    en orden de aparición); las filas de páginas con otra cabecera se
+    realinean por nombre de columna, con '' en las que no traen.
+    """
+    pages = iter(pages)
+    first = next(pages, None)
+    if first is None:
+        return
+    if not first.is_tsv:
+        yield from first.iter_bytes()
+        for page in pages:
+            yield from page.iter_bytes()
+        return
+
+    with tempfile.TemporaryFile() as spool:
+        # (cabecera, inicio, fin) del cuerpo de cada página en el temporal
+        spans: List[Tuple[bytes, int, int]] = []
+        for page in itertools.chain([first], pages):
+            header = b""
+            in_header = True
+            start = spool.tell()
+            for chunk in page.iter_bytes():
+                if in_header:
+                    head, newline, chunk = chunk.partition(b"\n")
+                    header += head
+                    if not newline:
+                        continue
+                    in_header = False
+                    start = spool.tell()
+                spool.write(chunk)
+            if header or not in_header:
+                spans.append((header, start, spool.tell()))
+
+        if not spans:
+            return
+
+        columns: Dict[bytes, None] = dict.fromkeys(spans[0][0].split(b"\t"))
+        for header, _, _ in spans[1:]:
+            for column in header.split(b"\t"):
+                columns.setdefault(column, None)
+        out_header = b"\t".join(columns)
+        if any(header != out_header for header, _, _ in spans):
+            logger.info("GDC /files: páginas con columnas distintas; se realinean por nombre")
+        yield out_header + b"\n"
+
+        for header, start, end in spans:
+            spool.seek(start)
+            if header == out_header:
+                remaining = end - start
+                while remaining > 0:
+                    chunk = spool.read(min(_FILES_CHUNK, remaining))
+                    remaining -= len(chunk)
+                    yield chunk
+                continue
+
+            positions = {column: i for i, column in enumerate(header.split(b"\t"))}
+            indices = [positions.get(column) for column in columns]
+            lines: List[bytes] = []
+            while spool.tell() < end:
+                line = spool.readline().rstrip(b"\n")
+                if not line:
+                    continue
+                row = line.split(b"\t")
+                lines.append(
+                    b"\t".join(
+                        row[i] if i is not None and i < len(row) else b"" for i in indices
+                    )
+                    + b"\n"
+                )
+                if len(lines) >= 1024:
+                    yield b"".join(lines)
+                    lines.clear()
+            if lines:
+                yield b"".join(lines)
+
+
+def _gdc_files_request(
+    filters: Dict[str, Any],
+    fields: str,
+    page_size: int,
+    token: Optional[str],
+    fmt: str,
+    offset: int = 0,
+) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Construye el cuerpo JSON (ya serializado) y las cabeceras de una
+    petición POST a /files. offset es el índice (base 0) del primer
+    resultado de la página ('from' en la API del GDC).
+    """
+    headers: Dict[str, str] = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    payload: Dict[str, Any] = {
+        "filters": filters,
+        "fields": fields,
+        "from": offset,
+        "size": page_size,
+    }
+
+    if fmt.upper() == "TSV":
+        payload["format"] = "tsv"
+    elif fmt.upper() == "JSON":
+        payload["format"] = "json"
+    else:
+        raise ValueError(f"Formato GDC no soportado: {fmt}")
+
+    return dumps_json_compact(payload), headers
 
 
 def _post_gdc_files(
@@ -112,14 +407,21 @@ def _post_gdc_files(
     token: Optional[str],
     timeout: int,
     fmt: str = "TSV",
-) -> str:
+    session: Optional[requests.Session] = None,
+    output_path: Optional[Path] = None,
+) -> Optional[bytes]:
     """
-    Lanza una petición POST al endpoint /files del GDC y devuelve la respuesta como texto.
+    Lanza una petición POST a un endpoint de búsqueda del GDC (/files,
+    /genes...) y devuelve la respuesta en bytes.
+
+    Los resultados se piden por páginas de page_size (ver
+    _iter_gdc_files_pages). Si se indica output_path, cada página se vuelca
+    a disco según llega, sin acumular la respuesta completa, y se devuelve None.
 
     Parameters
     ----------
     endpoint:
-        URL completa del endpoint /files.
+        URL completa del endpoint (p. ej. gdc_cfg.files_url o gdc_cfg.genes_url).
     filters:
         Diccionario de filtros en el formato del GDC.
     fields:
@@ -132,41 +434,204 @@ def _post_gdc_files(
         Timeout en segundos para la petición HTTP.
     fmt:
         Formato de salida ("TSV" o "JSON").
+    session:
+        Sesión HTTP a reutilizar (keep-alive); si es None se usa la
+        sesión compartida del módulo.
+    output_path:
+        Fichero de destino opcional para escribir la respuesta en streaming.
 
     Returns
     -------
-    str
-        Contenido de la respuesta como texto.
+    Optional[bytes]
+        Cuerpo de la respuesta sin decodificar (UTF-8), o None si se escribió
+        en output_path.
     """
-    headers: Dict[str, str] = {}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
+    logger.info("Llamando a GDC %s con campos: %s", endpoint, fields)
+    pages = _page_bodies(
+        _iter_gdc_files_pages(
+            endpoint, filters, fields, page_size, token, timeout, fmt=fmt, session=session
+        )
+    )
+    if output_path is None:
+        # Bytes tal cual: se escriben a disco sin decodificar/recodificar
+        return b"".join(pages)
 
-    payload: Dict[str, Any] = {
-        "filters": filters,
-        "fields": fields,
-        "size": page_size,
-    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("wb") as fh:
+        for content in pages:
+            fh.write(content)
+    return None
 
-    if fmt.upper() == "TSV":
-        payload["format"] = "tsv"
-    elif fmt.upper() == "JSON":
-        payload["format"] = "json"
+
+def _cached_post_gdc_files(
+    gdc_cfg: GDCConfig,
+    endpoint: str,
+    filters: Dict[str, Any],
+    fields: str,
+    token: Optional[str],
+    fmt: str = "TSV",
+    session: Optional[requests.Session] = None,
+    output_path: Optional[Path] = None,
+) -> Optional[bytes]:
+    """
+    Versión de _post_gdc_files con caché en disco opcional (gdc.cache_dir).
+
+    La clave es el SHA-256 de (endpoint, filtros, campos, page_size, formato).
+    El token no forma parte de la clave, pero las respuestas se guardan en un
+    subdirectorio por huella del token, de modo que cambiar de token no
+    reutiliza respuestas de otro. Una entrada más antigua que
+    gdc.cache_ttl_seconds se descarta y se vuelve a pedir.
+
+    Al caducar una entrada se revalida con una petición condicional
+    (If-None-Match / If-Modified-Since); un 304 la reutiliza sin descargarla.
+
+    Con output_path, la respuesta (de red o de caché) se escribe en ese
+    fichero sin pasar por memoria y se devuelve None.
+    """
+    if not gdc_cfg.cache_dir:
+        return _post_gdc_files(
+            endpoint=endpoint,
+            filters=filters,
+            fields=fields,
+            page_size=gdc_cfg.page_size,
+            token=token,
+            timeout=gdc_cfg.request_timeout,
+            fmt=fmt,
+            session=session,
+            output_path=output_path,
+        )
+
+    key_src = json.dumps(
+        {"e": endpoint, "f": filters, "fl": fields, "s": gdc_cfg.page_size, "fmt": fmt.upper()},
+        sort_keys=True,
+    )
+    key = hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+    token_dir = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16] if token else "anonymous"
+    cache_dir = Path(gdc_cfg.cache_dir).expanduser() / token_dir
+    cache_path = cache_dir / key
+
+    try:
+        age = time.time() - cache_path.stat().st_mtime
+    except FileNotFoundError:
+        age = None
+    if age is not None and age < gdc_cfg.cache_ttl_seconds:
+        logger.info("Respuesta de GDC /files leída de caché: %s", cache_path)
     else:
-        raise ValueError(f"Formato GDC no soportado: {fmt}")
+        _refresh_gdc_cache_entry(
+            gdc_cfg, endpoint, filters, fields, token, fmt, session, cache_path
+        )
 
-    logger.info("Llamando a GDC /files con campos: %s", fields)
-    response = requests.post(endpoint, json=payload, headers=headers, timeout=timeout)
-    response.raise_for_status()
-    return response.text
+    if output_path is None:
+        return cache_path.read_bytes()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(cache_path, output_path)
+    return None
 
 
-def write_text_to_file(content: str, output_path: Path) -> None:
+def _atomic_write_stream(path: Path, chunks: Iterable[bytes]) -> None:
+    """
+    Escribe bloques de bytes en path de forma atómica: fichero temporal en el
+    mismo directorio y os.replace al terminar.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _refresh_gdc_cache_entry(
+    gdc_cfg: GDCConfig,
+    endpoint: str,
+    filters: Dict[str, Any],
+    fields: str,
+    token: Optional[str],
+    fmt: str,
+    session: Optional[requests.Session],
+    cache_path: Path,
+) -> None:
+    """
+    Descarga (o revalida) una entrada de la caché de /files.
+
+    Junto a cada entrada se guardan el ETag y Last-Modified de la respuesta
+    en '<clave>.meta.json'. Si existen, la petición se hace condicional; ante
+    un 304 Not Modified solo se renueva la fecha de la entrada. Si el GDC no
+    devuelve validadores, la petición es una descarga normal.
+    """
+    meta_path = cache_path.with_name(cache_path.name + ".meta.json")
+    conditional_headers: Dict[str, str] = {}
+
+    if cache_path.is_file() and meta_path.is_file():
+        try:
+            validators = loads_json(meta_path.read_bytes())
+        except (OSError, ValueError):
+            validators = {}
+        if validators.get("etag"):
+            conditional_headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            conditional_headers["If-Modified-Since"] = validators["last_modified"]
+
+    logger.info("Llamando a GDC %s con campos: %s", endpoint, fields)
+    pages = _iter_gdc_files_pages(
+        endpoint,
+        filters,
+        fields,
+        gdc_cfg.page_size,
+        token,
+        gdc_cfg.request_timeout,
+        fmt=fmt,
+        session=session,
+        conditional_headers=conditional_headers,
+    )
+    first = next(pages)
+    if first.response.status_code == 304:
+        os.utime(cache_path)  # renueva el TTL de la entrada
+        logger.info("GDC /files sin cambios (304); se reutiliza la caché: %s", cache_path)
+        return
+
+    n_pages = 0
+
+    def _counted(page_iter: Iterable[_GdcPage]) -> Iterator[_GdcPage]:
+        nonlocal n_pages
+        for page in page_iter:
+            n_pages += 1
+            yield page
+
+    _atomic_write_stream(cache_path, _page_bodies(_counted(itertools.chain([first], pages))))
+
+    # Los validadores describen solo la primera página: se guardan únicamente
+    # si la respuesta completa cabe en ella
+    validators = {
+        key: value
+        for key, value in (
+            ("etag", first.response.headers.get("ETag")),
+            ("last_modified", first.response.headers.get("Last-Modified")),
+        )
+        if value
+    }
+    if validators and n_pages == 1:
+        _atomic_write_stream(meta_path, [dumps_json_compact(validators)])
+    else:
+        meta_path.unlink(missing_ok=True)
+
+
+def write_text_to_file(content: str | bytes, output_path: Path) -> None:
     """
     Escribe un texto en disco creando directorios intermedios si es necesario.
+
+    Si content ya son bytes (p. ej. el cuerpo de una respuesta HTTP en UTF-8)
+    se escriben directamente, sin una decodificación y recodificación extra.
     """
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(content, encoding="utf-8")
+    if isinstance(content, bytes):
+        output_path.write_bytes(content)
+    else:
+        output_path.write_text(content, encoding="utf-8")
     logger.info("Fichero escrito: %s", output_path)
 
 
@@ -211,7 +676,13 @@ def get_project_filename(project_id: str, file_type: str) -> str:
         raise ValueError(f"Unknown file_type: {file_type}")
 
 
-def download_manifest(gdc_cfg: GDCConfig, project_id: str, token: Optional[str]) -> Path:
+def download_manifest(
+    gdc_cfg: GDCConfig,
+    project_id: str,
+    token: Optional[str],
+    session: Optional[requests.Session] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Path:
     """
     Genera un manifest tipo GDC Data Transfer Tool para ficheros de expresión
     de un proyecto específico.
@@ -220,29 +691,40 @@ def download_manifest(gdc_cfg: GDCConfig, project_id: str, token: Optional[str])
         gdc_cfg: Configuración GDC
         project_id: ID del proyecto (e.g., "TCGA-LGG")
         token: Token GDC opcional
+        session: Sesión HTTP a reutilizar (opcional)
+        filters: Filtros /files ya construidos para el proyecto; si es None
+            se obtienen con build_gdc_files_filters
 
     Returns:
         Path del manifest generado
     """
-    files_endpoint = gdc_cfg.base_url.rstrip("/") + "/files"
-    filters = build_gdc_files_filters(gdc_cfg, project_id)
-    content = _post_gdc_files(
+    files_endpoint = gdc_cfg.files_url
+    if filters is None:
+        filters = build_gdc_files_filters(gdc_cfg, project_id)
+
+    project_dir = get_project_output_dir(gdc_cfg.base_output_dir, project_id)
+    output_path = project_dir / get_project_filename(project_id, "manifest")
+    _cached_post_gdc_files(
+        gdc_cfg,
         endpoint=files_endpoint,
         filters=filters,
-        fields=gdc_cfg.fields,
-        page_size=gdc_cfg.page_size,
+        fields=gdc_cfg.fields_param,
         token=token,
-        timeout=gdc_cfg.request_timeout,
         fmt="TSV",
+        session=session,
+        output_path=output_path,
     )
-
-    project_dir = get_project_output_dir(gdc_cfg.base_output_dir, project_id)
-    output_path = project_dir / get_project_filename(project_id, "manifest")
-    write_text_to_file(content, output_path)
+    logger.info("Fichero escrito: %s", output_path)
     return output_path
 
 
-def download_file_metadata(gdc_cfg: GDCConfig, project_id: str, token: Optional[str]) -> Path:
+def download_file_metadata(
+    gdc_cfg: GDCConfig,
+    project_id: str,
+    token: Optional[str],
+    session: Optional[requests.Session] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Path:
     """
     Descarga metadatos fichero–caso–muestra para los ficheros del manifest.
 
@@ -250,92 +732,238 @@ def download_file_metadata(gdc_cfg: GDCConfig, project_id: str, token: Optional[
         gdc_cfg: Configuración GDC
         project_id: ID del proyecto (e.g., "TCGA-LGG")
         token: Token GDC opcional
+        session: Sesión HTTP a reutilizar (opcional)
+        filters: Filtros /files ya construidos para el proyecto; si es None
+            se obtienen con build_gdc_files_filters
 
     Returns:
         Path del fichero de metadatos generado
     """
-    files_endpoint = gdc_cfg.base_url.rstrip("/") + "/files"
-    filters = build_gdc_files_filters(gdc_cfg, project_id)
-    content = _post_gdc_files(
+    files_endpoint = gdc_cfg.files_url
+    if filters is None:
+        filters = build_gdc_files_filters(gdc_cfg, project_id)
+
+    project_dir = get_project_output_dir(gdc_cfg.base_output_dir, project_id)
+    output_path = project_dir / get_project_filename(project_id, "metadata")
+    _cached_post_gdc_files(
+        gdc_cfg,
         endpoint=files_endpoint,
         filters=filters,
-        fields=gdc_cfg.file_metadata_fields,
-        page_size=gdc_cfg.page_size,
+        fields=gdc_cfg.file_metadata_fields_param,
         token=token,
-        timeout=gdc_cfg.request_timeout,
         fmt="TSV",
+        session=session,
+        output_path=output_path,
     )
+    logger.info("Fichero escrito: %s", output_path)
+    return output_path
+
+
+def _tsv_field_name(column: str) -> str:
+    """
+    Nombre del campo GDC de una columna TSV, sin los índices de lista que
+    añade el aplanado del GDC (p. ej. 'cases.0.samples.1.sample_type' ->
+    'cases.samples.sample_type').
+    """
+    return ".".join(part for part in column.split(".") if not part.isdigit())
+
+
+def _select_tsv_columns(row: List[str], indices: List[int]) -> str:
+    """Proyecta las columnas indicadas de una fila TSV (con salto de línea final)."""
+    return "\t".join(row[i] if i < len(row) else "" for i in indices) + "\n"
+
+
+def download_files_metadata_fused(
+    gdc_cfg: GDCConfig,
+    project_id: str,
+    token: Optional[str],
+    session: Optional[requests.Session] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Tuple[Path, Path]:
+    """
+    Descarga el manifest y los metadatos de ficheros con una única petición.
+
+    Ambos ficheros usan los mismos filtros sobre /files y solo difieren en
+    los campos, así que se pide la unión (sin duplicados y conservando el
+    orden) y las columnas se reparten localmente entre los dos TSV. Las
+    columnas que no corresponden a ningún campo pedido (p. ej. 'id', que el
+    GDC añade siempre) se conservan en ambos.
+
+    Args:
+        gdc_cfg: Configuración GDC
+        project_id: ID del proyecto (e.g., "TCGA-LGG")
+        token: Token GDC opcional
+        session: Sesión HTTP a reutilizar (opcional)
+        filters: Filtros /files ya construidos para el proyecto; si es None
+            se obtienen con build_gdc_files_filters
+
+    Returns:
+        Tupla (ruta del manifest, ruta de los metadatos)
+    """
+    manifest_fields = set(gdc_cfg.fields_tuple)
+    metadata_fields = set(gdc_cfg.file_metadata_fields_tuple)
+    fields = ",".join(dict.fromkeys(gdc_cfg.fields_tuple + gdc_cfg.file_metadata_fields_tuple))
+
+    files_endpoint = gdc_cfg.files_url
+    if filters is None:
+        filters = build_gdc_files_filters(gdc_cfg, project_id)
 
     project_dir = get_project_output_dir(gdc_cfg.base_output_dir, project_id)
-    output_path = project_dir / get_project_filename(project_id, "metadata")
-    write_text_to_file(content, output_path)
-    return output_path
+    manifest_path = project_dir / get_project_filename(project_id, "manifest")
+    metadata_path = project_dir / get_project_filename(project_id, "metadata")
+
+    # La respuesta se vuelca a un fichero temporal y se reparte línea a línea
+    raw_path = project_dir / f".{manifest_path.name}.fused.tmp"
+    try:
+        _cached_post_gdc_files(
+            gdc_cfg,
+            endpoint=files_endpoint,
+            filters=filters,
+            fields=fields,
+            token=token,
+            fmt="TSV",
+            session=session,
+            output_path=raw_path,
+        )
 
+        requested = manifest_fields | metadata_fields
+        manifest_idx: List[int] = []
+        metadata_idx: List[int] = []
+        header_seen = False
+        with raw_path.open("r", encoding="utf-8") as raw, \
+                manifest_path.open("w", encoding="utf-8") as fh_manifest, \
+                metadata_path.open("w", encoding="utf-8") as fh_metadata:
+            for line in raw:
+                line = line.rstrip("\n")
+                if not line:
+                    continue
+                row = line.split("\t")
+                if not header_seen:
+                    # Cabecera: decidir qué columnas van a cada fichero
+                    header_seen = True
+                    for i, column in enumerate(row):
+                        name = _tsv_field_name(column)
+                        if name in manifest_fields or name not in requested:
+                            manifest_idx.append(i)
+                        if name in metadata_fields or name not in requested:
+                            metadata_idx.append(i)
+                fh_manifest.write(_select_tsv_columns(row, manifest_idx))
+                fh_metadata.write(_select_tsv_columns(row, metadata_idx))
+    finally:
+        raw_path.unlink(missing_ok=True)
+
+    logger.info("Fichero escrito: %s", manifest_path)
+    logger.info("Fichero escrito: %s", metadata_path)
+    return manifest_path, metadata_path
+
+
+def download_project_metadata(
+    gdc_cfg: GDCConfig,
+    project_id: str,
+    token: Optional[str],
+    session: Optional[requests.Session] = None,
+) -> Tuple[Path, Path]:
+    """
+    Descarga el manifest y los metadatos de ficheros de un proyecto.
+
+    Se delega en download_files_metadata_fused: una sola petición a /files
+    en lugar de dos con los mismos filtros.
 
-def fetch_genes_table(gdc_cfg: GDCConfig, token: Optional[str]) -> None:
+    Args:
+        gdc_cfg: Configuración GDC
+        project_id: ID del proyecto (e.g., "TCGA-LGG")
+        token: Token GDC opcional
+        session: Sesión HTTP a reutilizar (opcional)
+
+    Returns:
+        Tupla (ruta del manifest, ruta de los metadatos)
+    """
+    return download_files_metadata_fused(gdc_cfg, project_id, token, session=session)
+
+
+def fetch_genes_table(
+    gdc_cfg: GDCConfig,
+    token: Optional[str],
+    session: Optional[requests.Session] = None,
+) -> None:
     """
     Recupera información básica de un conjunto pequeño de genes usando el endpoint /genes.
 
-    Para cada símbolo en gdc_cfg.gene_symbols se consulta /genes filtrando por 'symbol'
-    y se escribe una tabla TSV con columnas 'symbol' y 'gene_id'.
+    Todos los símbolos de gdc_cfg.gene_symbols se consultan en una única
+    petición POST a /genes (filtro 'in' sobre 'symbol') y se escribe una tabla
+    TSV con columnas 'symbol' y 'gene_id', en el orden de la configuración.
     """
     if not gdc_cfg.gene_symbols:
         logger.info("No hay símbolos de gen configurados; se omite /genes.")
         return
 
-    genes_endpoint = gdc_cfg.base_url.rstrip("/") + "/genes"
-    headers: Dict[str, str] = {"Content-Type": "application/json"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-
-    rows: List[str] = ["symbol\tgene_id"]
-
-    for symbol in gdc_cfg.gene_symbols:
-        filters = {
-            "op": "and",
-            "content": [
-                {
-                    "op": "in",
-                    "content": {
-                        "field": "symbol",
-                        "value": [symbol],
-                    },
-                }
-            ],
-        }
-
-        params = {
-            "filters": json.dumps(filters),
-            "fields": "gene_id,symbol",
-            "size": 5,
-        }
-
-        logger.info("Consultando /genes para símbolo: %s", symbol)
-        response = requests.get(
-            genes_endpoint, params=params, headers=headers, timeout=gdc_cfg.request_timeout
-        )
-        response.raise_for_status()
-        data = response.json()
+    symbols = list(gdc_cfg.gene_symbols)
+    filters = {
+        "op": "in",
+        "content": {
+            "field": "symbol",
+            "value": symbols,
+        },
+    }
 
-        hits = data.get("data", {}).get("hits", [])
-        if not hits:
-            logger.warning("Sin resultados para símbolo %s en /genes", symbol)
-            continue
+    logger.info("Consultando /genes para %d símbolo(s) en una sola petición", len(symbols))
+    content = _post_gdc_files(
+        endpoint=gdc_cfg.genes_url,
+        filters=filters,
+        fields="gene_id,symbol",
+        # Un símbolo puede devolver varios genes; se deja margen como con
+        # la antigua consulta por símbolo (size=5)
+        page_size=len(symbols) * 5,
+        token=token,
+        timeout=gdc_cfg.request_timeout,
+        fmt="JSON",
+        session=session,
+    )
+    hits = loads_json(content or b"{}").get("data", {}).get("hits", [])
 
-        hit = hits[0]
-        gene_id = hit.get("gene_id", "")
-        sym = hit.get("symbol", symbol)
-        rows.append(f"{sym}\t{gene_id}")
+    # Primer gene_id devuelto para cada símbolo
+    gene_ids: Dict[str, str] = {}
+    for hit in hits:
+        sym = hit.get("symbol")
+        if sym and sym not in gene_ids:
+            gene_ids[sym] = hit.get("gene_id", "")
 
-    output_path = Path(gdc_cfg.genes_output)
+    output_path = _genes_output_path(gdc_cfg)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    missing: List[str] = []
+    with output_path.open("w", encoding="utf-8", newline="", buffering=1 << 16) as fh:
+        # csv.writer escapa tabuladores/saltos de línea en los valores
+        writer = csv.writer(fh, delimiter="\t", lineterminator="\n")
+        writer.writerow(("symbol", "gene_id"))
+        for symbol in symbols:
+            if symbol in gene_ids:
+                writer.writerow((symbol, gene_ids[symbol]))
+            else:
+                missing.append(symbol)
+
+    if missing:
+        logger.warning("Sin resultados en /genes para %d símbolo(s): %s", len(missing), ", ".join(missing))
+
     logger.info("Tabla de genes escrita en: %s", output_path)
 
 
+def _genes_output_path(gdc_cfg: GDCConfig) -> Path:
+    """
+    Ruta de la tabla de genes de ejemplo: gdc.genes_output si está
+    configurado o, si no, {base_output_dir}/gdc_genes_example.tsv.
+    """
+    if gdc_cfg.genes_output:
+        return Path(gdc_cfg.genes_output).expanduser()
+    return Path(gdc_cfg.base_output_dir).expanduser() / "gdc_genes_example.tsv"
+
+
+@functools.lru_cache(maxsize=4)
 def load_gdc_token(token_path: Optional[str]) -> Optional[str]:
     """
     Carga el token del GDC desde disco si se ha configurado una ruta.
+
+    El resultado se memoiza por token_path durante la sesión; si el fichero
+    cambia, usar load_gdc_token.cache_clear() para volver a leerlo.
     """
     if not token_path:
         return None
@@ -373,8 +1001,10 @@ def select_files_from_manifest(
     selected: List[SelectedFile] = []
 
     with manifest_path.open("r", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh, delimiter="\t")
-        fieldnames = reader.fieldnames or []
+        # csv.reader con índices de columna precalculados: no se crea un
+        # diccionario por fila como con DictReader
+        reader = csv.reader(fh, delimiter="\t")
+        fieldnames = next(reader, [])
         logger.info("Columnas encontradas en el manifest: %s", fieldnames)
         
         if "file_name" not in fieldnames:
@@ -390,15 +1020,23 @@ def select_files_from_manifest(
             )
         
         logger.info("Usando campo '%s' como identificador de fichero", id_field)
+        id_idx = fieldnames.index(id_field)
+        name_idx = fieldnames.index("file_name")
+        # El nivel se consulta una vez, no en cada fila
+        debug = logger.isEnabledFor(logging.DEBUG)
 
         for idx, row in enumerate(reader, 1):
-            file_id = row[id_field]
-            file_name = row["file_name"]
+            # Filas cortas (o vacías): las columnas que faltan se tratan
+            # como vacías, igual que hacía DictReader
+            file_id = row[id_idx] if id_idx < len(row) else ""
             if not file_id:
-                logger.debug("Fila %d: file_id vacío, omitiendo", idx)
+                if debug:
+                    logger.debug("Fila %d: file_id vacío, omitiendo", idx)
                 continue
+            file_name = row[name_idx] if name_idx < len(row) else ""
             selected.append(SelectedFile(file_id=file_id, file_name=file_name))
-            logger.debug("Fila %d: Seleccionado %s (%s)", idx, file_name, file_id)
+            if debug:
+                logger.debug("Fila %d: Seleccionado %s (%s)", idx, file_name, file_id)
             if len(selected) >= max_files:
                 logger.info("Alcanzado el límite de %d ficheros", max_files)
                 break
@@ -409,11 +1047,112 @@ def select_files_from_manifest(
     return selected
 
 
+def _read_blocks(src: Any) -> Iterator[bytes]:
+    """Lee un flujo binario en bloques de _DATA_CHUNK hasta agotarlo."""
+    return iter(functools.partial(src.read, _DATA_CHUNK), b"")
+
+
+def _existing_download_is_complete(
+    http: requests.Session,
+    url: str,
+    headers: Dict[str, str],
+    path: Path,
+    gdc_cfg: GDCConfig,
+) -> bool:
+    """
+    Comprueba con una petición HEAD si un fichero ya descargado tiene el
+    tamaño que anuncia el servidor (Content-Length).
+
+    Si el servidor no responde o no informa del tamaño (o lo da comprimido
+    por Content-Encoding), se da el fichero por bueno como hasta ahora.
+    """
+    try:
+        head = http.head(url, headers=headers, timeout=gdc_cfg.request_timeout, allow_redirects=True)
+    except Exception as e:
+        logger.debug("HEAD %s falló (%s); se conserva %s", url, e, path)
+        return True
+
+    expected = head.headers.get("Content-Length")
+    if not head.ok or not expected or head.headers.get("Content-Encoding"):
+        return True
+    return path.stat().st_size == int(expected)
+
+
+def _download_one(
+    sf: SelectedFile,
+    http: requests.Session,
+    data_base_url: str,
+    headers: Dict[str, str],
+    output_dir: Path,
+    gdc_cfg: GDCConfig,
+) -> Path:
+    """
+    Descarga un único fichero desde /data/{file_id} a output_dir.
+
+    Si rnaseq.decompress_downloads está activo y el fichero es .gz, el cuerpo
+    se descomprime mientras se descarga y solo se guarda la versión sin .gz
+    (un único paso por disco). Si el servidor ya aplica gzip como
+    codificación de transporte se guarda el .gz y se descomprime después.
+    La escritura es atómica: una descarga interrumpida no deja un fichero
+    incompleto que la siguiente ejecución daría por bueno.
+
+    Si el fichero final ya existe y overwrite_existing es False no se vuelve
+    a descargar, salvo que su tamaño no coincida con el que anuncia el
+    servidor (p. ej. restos de una descarga interrumpida de versiones
+    anteriores). Devuelve la ruta local del fichero final.
+    """
+    dest_path = output_dir / sf.file_name
+    decompress = gdc_cfg.rnaseq.decompress_downloads and dest_path.suffix == ".gz"
+    final_path = dest_path.with_suffix("") if decompress else dest_path
+
+    url = f"{data_base_url}/{sf.file_id}"
+
+    if final_path.exists() and not gdc_cfg.rnaseq.overwrite_existing:
+        if decompress or _existing_download_is_complete(http, url, headers, final_path, gdc_cfg):
+            logger.info("Ya existe %s; se omite descarga.", final_path)
+            return final_path
+        logger.warning("El fichero existente %s está incompleto; se vuelve a descargar.", final_path)
+
+    logger.info("Descargando desde: %s", url)
+
+    try:
+        with http.get(url, headers=headers, stream=True, timeout=gdc_cfg.request_timeout) as r:
+            r.raise_for_status()
+            file_size = int(r.headers.get('content-length', 0))
+            logger.info("Tamaño de %s: %.2f MB", sf.file_name, file_size / (1024 * 1024))
+
+            transport_gzip = "gzip" in r.headers.get("Content-Encoding", "").lower()
+            if decompress and not transport_gzip:
+                # El cuerpo es el propio .gz: se descomprime al vuelo
+                r.raw.decode_content = False
+                with _gzip.open(r.raw, "rb") as src:
+                    _atomic_write_stream(final_path, _read_blocks(src))
+            else:
+                # Bloques de _DATA_CHUNK leídos directamente del flujo crudo
+                # (sin iter_content) y escritos de forma atómica;
+                # decode_content deshace la compresión de transporte
+                r.raw.decode_content = True
+                _atomic_write_stream(dest_path, _read_blocks(r.raw))
+
+        logger.info("Descarga completada: %s", final_path)
+
+        if decompress and transport_gzip:
+            logger.info("Descomprimiendo fichero...")
+            _decompress_gzip_in_place(dest_path)
+    except Exception as e:
+        logger.error("Error al descargar %s: %s", sf.file_name, e)
+        raise
+
+    return final_path
+
+
 def download_files_via_data_endpoint(
     gdc_cfg: GDCConfig,
     project_id: str,
     token: Optional[str],
     files_to_download: Sequence[SelectedFile],
+    session: Optional[requests.Session] = None,
+    on_downloaded: Optional[Callable[[int, Path], None]] = None,
 ) -> List[Path]:
     """
     Descarga una lista de ficheros desde el endpoint /data/{file_id}.
@@ -428,6 +1167,12 @@ def download_files_via_data_endpoint(
         Token GDC o None.
     files_to_download:
         Secuencia de SelectedFile con UUID y nombre remoto.
+    session:
+        Sesión HTTP a reutilizar entre ficheros (opcional).
+    on_downloaded:
+        Función opcional llamada como on_downloaded(índice, ruta) en cuanto
+        termina cada fichero (índice en files_to_download), mientras el resto
+        sigue descargándose.
 
     Returns
     -------
@@ -441,7 +1186,7 @@ def download_files_via_data_endpoint(
         logger.info("No hay ficheros seleccionados para descarga; se omite /data.")
         return []
 
-    data_base_url = gdc_cfg.base_url.rstrip("/") + "/data"
+    data_base_url = gdc_cfg.data_url
     # Build project-specific star_counts directory
     project_dir = get_project_output_dir(gdc_cfg.base_output_dir, project_id)
     output_dir = project_dir / "star_counts"
@@ -460,41 +1205,34 @@ def download_files_via_data_endpoint(
     else:
         logger.info("No se está usando token de autenticación")
 
-    downloaded_paths: List[Path] = []
-
-    for idx, sf in enumerate(files_to_download, 1):
-        dest_path = output_dir / sf.file_name
-        logger.info("Procesando fichero %d/%d: %s", idx, len(files_to_download), sf.file_name)
-
-        if dest_path.exists() and not gdc_cfg.rnaseq.overwrite_existing:
-            logger.info("Ya existe %s; se omite descarga.", dest_path)
-            downloaded_paths.append(dest_path)
-            continue
-
-        url = f"{data_base_url}/{sf.file_id}"
-        logger.info("Descargando desde: %s", url)
-
+    http = session if session is not None else _get_session()
+    n_files = len(files_to_download)
+    max_workers = max(1, min(gdc_cfg.rnaseq.parallel_downloads, n_files))
+    logger.info("Descargas en paralelo: %d", max_workers)
+
+    # Las descargas /data son independientes y limitadas por la red: se
+    # solapan en hilos y se devuelven en el orden del manifest
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _download_one, sf, http, data_base_url, headers, output_dir, gdc_cfg
+            )
+            for sf in files_to_download
+        ]
+        indices = {future: idx for idx, future in enumerate(futures)}
         try:
-            with requests.get(url, headers=headers, stream=True, timeout=gdc_cfg.request_timeout) as r:
-                r.raise_for_status()
-                file_size = int(r.headers.get('content-length', 0))
-                logger.info("Tamaño del fichero: %.2f MB", file_size / (1024 * 1024))
-                
-                with dest_path.open("wb") as fh:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk:
-                            fh.write(chunk)
-
-            downloaded_paths.append(dest_path)
-            logger.info("Descarga completada: %s", dest_path)
-
-            if gdc_cfg.rnaseq.decompress_downloads and dest_path.suffix == ".gz":
-                logger.info("Descomprimiendo fichero...")
-                _decompress_gzip_in_place(dest_path)
-        except Exception as e:
-            logger.error("Error al descargar %s: %s", sf.file_name, e)
+            for done, future in enumerate(as_completed(futures), 1):
+                path = future.result()
+                logger.info("Progreso /data %d/%d: %s", done, n_files, path.name)
+                if on_downloaded is not None:
+                    on_downloaded(indices[future], path)
+        except BaseException:
+            for future in futures:
+                future.cancel()
             raise
 
+    downloaded_paths = [future.result() for future in futures]
+
     logger.info("Descarga completada. Total de ficheros descargados: %d", len(downloaded_paths))
     return downloaded_paths
 
@@ -506,81 +1244,166 @@ def _decompress_gzip_in_place(gz_path: Path) -> Path:
     target_path = gz_path.with_suffix("")
     logger.info("Descomprimiendo %s -> %s", gz_path, target_path)
 
-    with gzip.open(gz_path, "rb") as src, target_path.open("wb") as dst:
-        for chunk in iter(lambda: src.read(8192), b""):
-            if not chunk:
-                break
-            dst.write(chunk)
+    with _gzip.open(gz_path, "rb") as src, target_path.open("wb") as dst:
+        shutil.copyfileobj(src, dst, length=_DATA_CHUNK)
 
     logger.info("Descompresión completada: %s", target_path)
     return target_path
 
 
-def _open_text_maybe_gzip(path: Path) -> Iterable[str]:
+@contextlib.contextmanager
+def _open_maybe_gzip(path: Path, mode: str = "rt") -> Iterator[IO[Any]]:
     """
-    Abre un fichero de texto que puede estar comprimido (.gz) y devuelve un iterable
-    de líneas decodificadas en UTF-8.
+    Abre un fichero que puede estar comprimido (.gz) en modo mode ("rt" o
+    "rb") y garantiza su cierre aunque el llamador salga antes de terminar
+    o se produzca una excepción. gzip (e igzip) admiten ficheros con varios
+    miembros concatenados.
     """
     if path.suffix == ".gz":
-        fh = gzip.open(path, "rt", encoding="utf-8")
+        fh = _gzip.open(path, mode, encoding="utf-8" if "t" in mode else None)
     else:
-        fh = path.open("r", encoding="utf-8")
-    return fh
+        fh = path.open(mode, encoding="utf-8" if "t" in mode else None)
+    try:
+        yield fh
+    finally:
+        fh.close()
 
 
-def extract_gene_ids_from_star_counts(
+def _open_text_maybe_gzip(path: Path) -> ContextManager[IO[str]]:
+    """
+    Abre un fichero de texto que puede estar comprimido (.gz) y devuelve un
+    gestor de contexto con las líneas decodificadas en UTF-8.
+    """
+    return _open_maybe_gzip(path, "rt")
+
+
+def _collect_star_counts_gene_ids(
     counts_file: Path,
     gene_id_column_index: int,
-    strip_version: bool,
-) -> List[str]:
+) -> Set[str]:
     """
-    Extrae los identificadores de gen (Ensembl IDs) de un fichero STAR-Counts.
+    Recorre un fichero STAR-Counts y devuelve el conjunto de gene IDs tal
+    como aparecen en el fichero (con versión). El ID sin versión se deriva
+    al escribir (ver _gene_id_lines), así que no se almacena.
 
     Se asume que los Ensembl IDs están en la columna gene_id_column_index (por defecto 0).
     Se ignoran filas cuyo primer campo no parezca un ID Ensembl (p. ej. cabeceras).
     """
     logger.info("Iniciando extracción de gene IDs desde: %s", counts_file)
     logger.info("Columna de gene_id: %d", gene_id_column_index)
-    logger.info("Strip version: %s", strip_version)
     
     if not counts_file.is_file():
         logger.error("No se encontró el fichero de counts: %s", counts_file)
         raise FileNotFoundError(f"No se encontró el fichero de counts: {counts_file}")
 
-    gene_ids: set[tuple[str, str]] = set()
-
-    with _open_text_maybe_gzip(counts_file) as fh:
-        reader = csv.reader(fh, delimiter="\t")
-        total_rows = 0
-        skipped_rows = 0
-        
-        for row in reader:
-            total_rows += 1
-            if not row:
-                skipped_rows += 1
-                continue
-            if gene_id_column_index >= len(row):
-                skipped_rows += 1
-                continue
-            raw_id = row[gene_id_column_index].strip()
-            if not raw_id:
-                skipped_rows += 1
-                continue
-            # Heurística simple: la mayoría de Ensembl genes empiezan por 'ENSG'
-            if not raw_id.upper().startswith("ENSG"):
-                skipped_rows += 1
-                continue
-            clean_id = raw_id.split(".")[0] if strip_version else raw_id
-            gene_ids.add((raw_id, clean_id))
-
-    # Ordenamos para tener salida determinista
-    sorted_pairs = sorted(gene_ids, key=lambda x: x[0])
+    gene_ids: Set[str] = set()
+    total_rows = 0
+    skipped_rows = 0
+
+    if gene_id_column_index == 0:
+        # Camino rápido para el caso habitual (ID en la primera columna):
+        # se recorren líneas en bytes y solo se decodifica el ID, sin pasar
+        # por csv.reader ni decodificar la fila completa
+        with _open_maybe_gzip(counts_file, "rb") as fh:
+            for line in fh:
+                total_rows += 1
+                raw = line.split(b"\t", 1)[0].strip()
+                # startswith cubre los IDs habituales (en mayúsculas) sin
+                # crear copias; upper() solo se evalúa en filas que no lo son
+                if not (raw.startswith(b"ENSG") or raw[:4].upper() == b"ENSG"):
+                    skipped_rows += 1
+                    continue
+                gene_ids.add(raw.decode("utf-8"))
+    else:
+        with _open_text_maybe_gzip(counts_file) as fh:
+            reader = csv.reader(fh, delimiter="\t")
+
+            for row in reader:
+                total_rows += 1
+                if not row:
+                    skipped_rows += 1
+                    continue
+                if gene_id_column_index >= len(row):
+                    skipped_rows += 1
+                    continue
+                raw_id = row[gene_id_column_index].strip()
+                if not raw_id:
+                    skipped_rows += 1
+                    continue
+                # Heurística simple: la mayoría de Ensembl genes empiezan por 'ENSG'
+                if not (raw_id.startswith("ENSG") or raw_id[:4].upper() == "ENSG"):
+                    skipped_rows += 1
+                    continue
+                gene_ids.add(raw_id)
 
     logger.info("Total de filas procesadas: %d", total_rows)
     logger.info("Filas omitidas: %d", skipped_rows)
-    logger.info("Genes únicos extraídos: %d", len(sorted_pairs))
-    
-    return [f"{raw}\t{clean}" for raw, clean in sorted_pairs]
+    logger.info("Genes únicos extraídos: %d", len(gene_ids))
+
+    return gene_ids
+
+
+def extract_gene_ids_from_star_counts(
+    counts_file: Path,
+    gene_id_column_index: int,
+    strip_version: bool,
+) -> List[str]:
+    """
+    Extrae los identificadores de gen (Ensembl IDs) de un fichero STAR-Counts.
+
+    Devuelve líneas "gene_id_original\tgene_id_limpio" ordenadas por el ID
+    original. build_gene_table_from_counts no usa esta lista: escribe la
+    tabla directamente desde _collect_star_counts_gene_ids.
+    """
+    gene_ids = _collect_star_counts_gene_ids(counts_file, gene_id_column_index)
+    return list(_gene_id_lines(gene_ids, strip_version))
+
+
+def _gene_id_lines(gene_ids: Set[str], strip_version: bool) -> Iterator[str]:
+    """
+    Genera las líneas "gene_id_original\tgene_id_limpio" (sin salto de línea)
+    ordenadas por el ID original, para tener salida determinista.
+    """
+    logger.info("Strip version: %s", strip_version)
+    for raw in sorted(gene_ids):
+        yield f"{raw}\t{raw.split('.', 1)[0] if strip_version else raw}"
+
+
+def _collect_gene_ids_across_files(
+    counts_files: Sequence[Path],
+    gene_id_column_index: int,
+) -> Set[str]:
+    """
+    Extrae los gene IDs de varios ficheros STAR-Counts en paralelo (un
+    hilo por fichero) y devuelve su unión. Avisa si los ficheros no
+    contienen el mismo conjunto de genes.
+
+    Se usan hilos y no procesos: esta función se ejecuta en segundo plano
+    mientras otros hilos siguen descargando /data, y hacer fork de un
+    proceso con hilos activos puede bloquearse en sus locks (urllib3, ssl,
+    logging). El trabajo es sobre todo E/S y descompresión gzip.
+    """
+    logger.info("Extrayendo gene IDs de %d ficheros en paralelo", len(counts_files))
+    max_workers = max(1, min(os.cpu_count() or 1, len(counts_files)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        gene_id_sets = list(
+            executor.map(
+                _collect_star_counts_gene_ids,
+                counts_files,
+                itertools.repeat(gene_id_column_index),
+            )
+        )
+
+    union: Set[str] = set().union(*gene_id_sets)
+    for path, ids in zip(counts_files, gene_id_sets):
+        if len(ids) != len(union):
+            logger.warning(
+                "El fichero %s contiene %d de %d genes de la unión",
+                path,
+                len(ids),
+                len(union),
+            )
+    return union
 
 
 def build_gene_table_from_counts(
@@ -590,7 +1413,8 @@ def build_gene_table_from_counts(
 ) -> Optional[Path]:
     """
     Construye la tabla de genes del proyecto a partir de uno de los ficheros
-    STAR-Counts descargados.
+    STAR-Counts descargados (el primero), o de la unión de todos si
+    rnaseq.verify_across_files está activo.
 
     Args:
         gdc_cfg: Configuración GDC
@@ -609,15 +1433,18 @@ def build_gene_table_from_counts(
         )
         return None
 
-    counts_file = downloaded_files[0]
-    logger.info("Usando como referencia el fichero: %s", counts_file)
-
     try:
-        lines = extract_gene_ids_from_star_counts(
-            counts_file=counts_file,
-            gene_id_column_index=gdc_cfg.rnaseq.gene_id_column_index,
-            strip_version=gdc_cfg.rnaseq.strip_version,
-        )
+        if gdc_cfg.rnaseq.verify_across_files and len(downloaded_files) > 1:
+            gene_ids = _collect_gene_ids_across_files(
+                downloaded_files, gdc_cfg.rnaseq.gene_id_column_index
+            )
+        else:
+            counts_file = downloaded_files[0]
+            logger.info("Usando como referencia el fichero: %s", counts_file)
+            gene_ids = _collect_star_counts_gene_ids(
+                counts_file=counts_file,
+                gene_id_column_index=gdc_cfg.rnaseq.gene_id_column_index,
+            )
     except Exception as e:
         logger.error("Error al extraer gene IDs: %s", e)
         raise
@@ -627,12 +1454,16 @@ def build_gene_table_from_counts(
     output_path = project_dir / get_project_filename(project_id, "genes")
     logger.info("Ruta de salida de la tabla de genes: %s", output_path)
 
-    header = "ensembl_gene_id_gdc\tensembl_gene_id"
-    content = "\n".join([header] + lines) + "\n"
-    output_path.write_text(content, encoding="utf-8")
+    # Se escribe fila a fila (ordenada para tener salida determinista) sin
+    # construir la tabla completa como texto en memoria
+    with output_path.open("w", encoding="utf-8", buffering=1 << 16) as fh:
+        fh.write("ensembl_gene_id_gdc\tensembl_gene_id\n")
+        fh.writelines(
+            f"{line}\n" for line in _gene_id_lines(gene_ids, gdc_cfg.rnaseq.strip_version)
+        )
 
     logger.info("Tabla de genes del proyecto escrita en: %s", output_path)
-    logger.info("Total de genes en la tabla: %d", len(lines))
+    logger.info("Total de genes en la tabla: %d", len(gene_ids))
     return output_path
 
 
@@ -641,6 +1472,7 @@ def run_rnaseq_download_and_gene_extraction(
     project_id: str,
     manifest_path: Path,
     token: Optional[str],
+    session: Optional[requests.Session] = None,
 ) -> None:
     """
     Orquesta la selección de ficheros STAR-Counts, descarga vía /data y
@@ -651,6 +1483,7 @@ def run_rnaseq_download_and_gene_extraction(
         project_id: ID del proyecto (e.g., "TCGA-LGG")
         manifest_path: Path al manifest del proyecto
         token: Token GDC opcional
+        session: Sesión HTTP a reutilizar (opcional)
     """
     logger.info("=" * 80)
     logger.info("INICIANDO PROCESO DE DESCARGA RNA-SEQ Y EXTRACCIÓN DE GENES PARA %s", project_id)
@@ -687,31 +1520,52 @@ def run_rnaseq_download_and_gene_extraction(
         logger.info("=" * 80)
         return
 
-    try:
-        downloaded_paths = download_files_via_data_endpoint(
-            gdc_cfg=gdc_cfg,
-            project_id=project_id,
-            token=token,
-            files_to_download=selected_files,
-        )
-    except Exception as e:
-        logger.error("Error durante la descarga de ficheros: %s", e)
-        logger.info("=" * 80)
-        raise
+    # La tabla de genes solo necesita el primer fichero: se construye en
+    # segundo plano en cuanto termina su descarga, mientras siguen las demás
+    # (salvo con verify_across_files, que usa todos los ficheros)
+    gene_table_futures: List[Future] = []
 
-    if not downloaded_paths:
-        logger.warning(
-            "No se descargaron ficheros RNA-seq; no se puede construir la tabla de genes."
-        )
-        logger.info("=" * 80)
-        return
+    with ThreadPoolExecutor(max_workers=1) as gene_table_executor:
 
-    try:
-        build_gene_table_from_counts(gdc_cfg, project_id, downloaded_paths)
-    except Exception as e:
-        logger.error("Error al construir la tabla de genes: %s", e)
-        logger.info("=" * 80)
-        raise
+        def _on_downloaded(idx: int, path: Path) -> None:
+            if idx == 0 and not gdc_cfg.rnaseq.verify_across_files:
+                gene_table_futures.append(
+                    gene_table_executor.submit(
+                        build_gene_table_from_counts, gdc_cfg, project_id, [path]
+                    )
+                )
+
+        try:
+            downloaded_paths = download_files_via_data_endpoint(
+                gdc_cfg=gdc_cfg,
+                project_id=project_id,
+                token=token,
+                files_to_download=selected_files,
+                session=session,
+                on_downloaded=_on_downloaded,
+            )
+        except Exception as e:
+            logger.error("Error durante la descarga de ficheros: %s", e)
+            logger.info("=" * 80)
+            raise
+
+        if not downloaded_paths:
+            logger.warning(
+                "No se descargaron ficheros RNA-seq; no se puede construir la tabla de genes."
+            )
+            logger.info("=" * 80)
+            return
+
+        try:
+            if gdc_cfg.rnaseq.verify_across_files:
+                # Necesita todos los ficheros: se construye al terminar
+                build_gene_table_from_counts(gdc_cfg, project_id, downloaded_paths)
+            for future in gene_table_futures:
+                future.result()
+        except Exception as e:
+            logger.error("Error al construir la tabla de genes: %s", e)
+            logger.info("=" * 80)
+            raise
 
     logger.info("=" * 80)
     logger.info("PROCESO DE DESCARGA RNA-SEQ COMPLETADO EXITOSAMENTE PARA %s", project_id)
@@ -722,47 +1576,30 @@ def main(config_path: str = "data_config.yaml") -> None:
     """
     Punto de entrada principal del script.
 
-    Multi-project support: Procesa todos los proyectos configurados en project_ids.
-    Para cada proyecto:
+    Multi-project support: Procesa todos los proyectos configurados en project_ids
+    con la misma orquestación que el CLI (biointegrate.cli.data.download_gdc_data):
+    hasta gdc.max_parallel_projects proyectos en paralelo y la tabla de genes
+    de ejemplo (/genes) en segundo plano. Para cada proyecto:
     - Descarga el manifest de expresión
     - Descarga la tabla de metadatos fichero–caso–muestra
     - Descarga N ficheros STAR-Counts vía /data
     - Construye la tabla de genes del proyecto
     """
+    # Importado aquí: cli.data importa este módulo dentro de sus funciones
+    from biointegrate.cli.data import download_gdc_data
+
     setup_logging()
     logger.info("Cargando configuración desde: %s", config_path)
 
-    app_cfg: AppConfig = load_app_config(Path(config_path))
+    app_cfg: AppConfig = load_app_config(Path(config_path).expanduser().resolve())
     gdc_cfg: GDCConfig = app_cfg.gdc
 
-    token = load_gdc_token(gdc_cfg.token_path)
-
     logger.info("=" * 100)
     logger.info("INICIANDO DESCARGA DE DATOS GDC PARA %d PROYECTO(S)", len(gdc_cfg.project_ids))
     logger.info("Proyectos: %s", ", ".join(gdc_cfg.project_ids))
     logger.info("=" * 100)
 
-    # Process each project
-    for project_idx, project_id in enumerate(gdc_cfg.project_ids, 1):
-        logger.info("\n" + "=" * 100)
-        logger.info("PROCESANDO PROYECTO %d/%d: %s", project_idx, len(gdc_cfg.project_ids), project_id)
-        logger.info("=" * 100)
-
-        try:
-            logger.info("Paso 1/3: Descargando manifest para %s...", project_id)
-            manifest_path = download_manifest(gdc_cfg, project_id, token)
-
-            logger.info("Paso 2/3: Descargando metadatos de ficheros para %s...", project_id)
-            download_file_metadata(gdc_cfg, project_id, token)
-
-            logger.info("Paso 3/3: Ejecutando descarga RNA-seq y extracción de genes para %s...", project_id)
-            run_rnaseq_download_and_gene_extraction(gdc_cfg, project_id, manifest_path, token)
-
-            logger.info("✓ Proyecto %s completado exitosamente", project_id)
-
-        except Exception as e:
-            logger.error("✗ Error al procesar proyecto %s: %s", project_id, e, exc_info=True)
-            raise
+    download_gdc_data(app_cfg)
 
     logger.info("\n" + "=" * 100)
     logger.info("DESCARGA COMPLETADA PARA TODOS LOS PROYECTOS")
@@ -6,12 +6,15 @@ Script para descargar de forma programática el fichero completo de HGNC
 from __future__ import annotations
 
 import argparse
+import functools
 import logging
 from pathlib import Path
+from typing import Optional
 
 import requests
 
 from biointegrate.data.config import AppConfig, HGNCConfig, load_app_config
+from biointegrate.utils.http import STREAM_CHUNK_SIZE, get_shared_session
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +29,10 @@ def configure_logging(level: int = logging.INFO) -> None:
     )
 
 
-def download_hgnc_complete_set(config: HGNCConfig) -> Path:
+def download_hgnc_complete_set(
+    config: HGNCConfig,
+    session: Optional[requests.Session] = None,
+) -> Path:
     """
     Descarga el fichero hgnc_complete_set.txt desde la URL pública de HGNC
     y lo guarda en la ruta indicada por output_path.
@@ -37,6 +43,9 @@ def download_hgnc_complete_set(config: HGNCConfig) -> Path:
     ----------
     config : HGNCConfig
         Configuración de HGNC que incluye la URL y ruta de salida.
+    session : requests.Session, optional
+        Sesión HTTP a reutilizar; si es None se usa la sesión compartida
+        del proceso.
     
     Returns
     -------
@@ -67,7 +76,8 @@ def download_hgnc_complete_set(config: HGNCConfig) -> Path:
 
     logger.info("Iniciando descarga del conjunto completo de HGNC...")
     try:
-        response = requests.get(url, stream=True, timeout=config.request_timeout)
+        http = session if session is not None else get_shared_session()
+        response = http.get(url, stream=True, timeout=config.request_timeout)
         response.raise_for_status()
         
         # Obtener tamaño del archivo si está disponible
@@ -76,15 +86,21 @@ def download_hgnc_complete_set(config: HGNCConfig) -> Path:
             logger.info("Tamaño del archivo a descargar: %.2f MB", total_size / (1024 * 1024))
         
         bytes_downloaded = 0
+        progress_step = 10 * 1024 * 1024
+        next_progress = progress_step
+        # Lectura directa del flujo crudo (sin el generador de iter_content);
+        # decode_content deshace la compresión de transporte
+        response.raw.decode_content = True
         with output_path.open("wb") as fh:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in iter(functools.partial(response.raw.read, STREAM_CHUNK_SIZE), b""):
                 if chunk:
                     fh.write(chunk)
                     bytes_downloaded += len(chunk)
                     
                     # Log de progreso cada 10 MB
-                    if bytes_downloaded % (10 * 1024 * 1024) < 8192:
+                    if bytes_downloaded >= next_progress:
                         logger.info("Descargados: %.2f MB", bytes_downloaded / (1024 * 1024))
+                        next_progress += progress_step
         
         final_size_mb = bytes_downloaded / (1024 * 1024)
         logger.info("✓ Descarga completada exitosamente")
@@ -26,16 +26,38 @@ Requisitos:
 from __future__ import annotations
 
 import argparse
+import contextlib
 import csv
+import gzip
+import hashlib
+import io
+import json
 import logging
+import mmap
+import multiprocessing
+import operator
+import os
+import random
+import re
 import sys
+import tempfile
 import time
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import AbstractSet, Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 import requests
 
 from biointegrate.data.config import AppConfig, UniProtConfig, load_app_config
+from biointegrate.utils.http import (
+    AdaptiveConcurrency,
+    RateLimiter,
+    create_http_session,
+    get_shared_session,
+    parse_retry_after,
+)
+from biointegrate.utils.json_io import dumps_json_compact, loads_json
 
 
 class UniProtAPIError(RuntimeError):
@@ -43,6 +65,39 @@ class UniProtAPIError(RuntimeError):
     pass
 
 
+class UniProtBatchTooLargeError(UniProtAPIError):
+    """UniProt rechazó un lote por tamaño (HTTP 413/414)."""
+    pass
+
+
+# Valores de HGNC que deben cumplir los genes seleccionados
+PROTEIN_CODING_GROUP = sys.intern("protein-coding gene")
+PROTEIN_PRODUCT_TYPE = sys.intern("gene with protein product")
+
+# Filas de mapeo acumuladas antes de volcarlas al fichero
+MAPPING_FLUSH_ROWS = 10_000
+
+# Búfer de los TSV de salida: menos llamadas write() al sistema operativo
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Línea vacía o solo con espacios/tabuladores en un cuerpo TSV
+_BLANK_LINE = re.compile(r"^[^\S\n]*(?:\n|\Z)", re.MULTILINE)
+
+# Servicio ID Mapping: accesos por trabajo (límite de UniProt), espera
+# máxima hasta que termina y suelo y techo del intervalo entre consultas
+# de estado
+IDMAPPING_MAX_IDS = 100_000
+IDMAPPING_MAX_WAIT = 1800
+IDMAPPING_MIN_POLL_INTERVAL = 1.0
+IDMAPPING_MAX_POLL_INTERVAL = 10.0
+
+# Longitud máxima de URL que se envía por GET; por encima se usa POST
+MAX_GET_URL_LENGTH = 8000
+
+# Resultados máximos por petición a /uniprotkb/search (parámetro size)
+MAX_SEARCH_PAGE_SIZE = 500
+
+
 # ---------------------------------------------------------------------------
 # Utilidades generales
 # ---------------------------------------------------------------------------
@@ -65,7 +120,7 @@ def chunked(seq: Sequence[str], size: int) -> Iterable[List[str]]:
 # Carga y filtrado de GDC / HGNC
 # ---------------------------------------------------------------------------
 
-def load_project_ensembl_ids(project_genes_path: Path) -> Set[str]:
+def load_project_ensembl_ids(project_genes_path: Path) -> FrozenSet[str]:
     """
     Carga los Ensembl gene IDs del proyecto GDC desde gdc_genes_tcga_lgg.tsv.
 
@@ -82,19 +137,21 @@ def load_project_ensembl_ids(project_genes_path: Path) -> Set[str]:
     ensembl_ids: Set[str] = set()
 
     with project_genes_path.open("r", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh, delimiter="\t")
-        if "ensembl_gene_id" not in (reader.fieldnames or []):
+        reader = csv.reader(fh, delimiter="\t")
+        fieldnames = next(reader, [])
+        if "ensembl_gene_id" not in fieldnames:
             raise ValueError(
                 f"El fichero {project_genes_path} no contiene la columna 'ensembl_gene_id'."
             )
+        idx = fieldnames.index("ensembl_gene_id")
 
         for row in reader:
-            eid = (row.get("ensembl_gene_id") or "").strip()
+            eid = row[idx].strip() if idx < len(row) else ""
             if eid:
                 ensembl_ids.add(eid)
 
     logger.info("Ensembl IDs del proyecto cargados: %d", len(ensembl_ids))
-    return ensembl_ids
+    return frozenset(ensembl_ids)
 
 
 def parse_uniprot_ids_field(value: str) -> List[str]:
@@ -110,125 +167,303 @@ def parse_uniprot_ids_field(value: str) -> List[str]:
     return [p for p in parts if p]
 
 
-def extract_project_uniprot_ids(
-    project_ensembl_ids: Set[str],
+# Fila HGNC que pasa los filtros que no dependen del proyecto:
+# (Ensembl IDs, hgnc_id, symbol, accesos UniProt)
+_HgncCandidate = Tuple[Tuple[str, ...], str, str, List[str]]
+
+# Coincidencia con un proyecto: (Ensembl IDs del proyecto, hgnc_id, symbol, accesos)
+_HgncMatch = Tuple[List[str], str, str, List[str]]
+
+# Columnas de HGNC que se usan (ahora exigimos locus_group, no solo locus_type)
+HGNC_REQUIRED_COLUMNS = (
+    "ensembl_gene_id",
+    "hgnc_id",
+    "symbol",
+    "locus_group",
+    "locus_type",
+    "uniprot_ids",
+)
+
+
+def _hgnc_candidates(
+    rows: Iterable[List[str]],
+    column_indices: Sequence[int],
+) -> Iterator[_HgncCandidate]:
+    """
+    Aplica a filas HGNC ya separadas los filtros que no dependen del
+    proyecto (tipo de locus, UniProt y Ensembl no vacíos) y devuelve, en
+    orden, las que pasan.
+
+    column_indices son las posiciones de HGNC_REQUIRED_COLUMNS.
+    """
+    # Solo se extraen de cada fila las columnas necesarias, por posición,
+    # en lugar de construir un dict con las decenas de columnas de HGNC
+    pick_columns = operator.itemgetter(*column_indices)
+    min_width = max(column_indices) + 1
+
+    for row in rows:
+        if len(row) < min_width:
+            row = row + [""] * (min_width - len(row))
+        (
+            ensembl_field,
+            hgnc_id,
+            symbol,
+            locus_group,
+            locus_type,
+            uniprot_field,
+        ) = pick_columns(row)
+
+        # 1) Filtros baratos primero: tipo de locus y campo UniProt no vacío.
+        #    En HGNC todo locus_group "protein-coding gene" tiene locus_type
+        #    "gene with protein product"; se exigen ambos en una condición.
+        #    Se compara antes de hacer strip: los valores casi nunca llevan
+        #    espacios y la igualdad directa basta
+        if (
+            (locus_group != PROTEIN_CODING_GROUP and locus_group.strip() != PROTEIN_CODING_GROUP)
+            or (locus_type != PROTEIN_PRODUCT_TYPE and locus_type.strip() != PROTEIN_PRODUCT_TYPE)
+        ):
+            continue
+
+        uniprot_accessions = parse_uniprot_ids_field(uniprot_field)
+        if not uniprot_accessions:
+            continue
+
+        # 2) Ensembl IDs del gen (posiblemente múltiples separados por '|').
+        #    Solo se hace strip de cada ID si el campo contiene algún espacio
+        ensembl_field = ensembl_field.strip()
+        if " " in ensembl_field or not ensembl_field.isprintable():
+            ensembl_ids = tuple(
+                eid for eid in (part.strip() for part in ensembl_field.split("|")) if eid
+            )
+        else:
+            ensembl_ids = tuple(eid for eid in ensembl_field.split("|") if eid)
+        if not ensembl_ids:
+            continue
+
+        yield ensembl_ids, hgnc_id.strip(), symbol.strip(), uniprot_accessions
+
+
+def _scan_hgnc_byte_range(
     hgnc_path: Path,
-    mapping_output_path: Path,
-    max_accessions: Optional[int],
-) -> Tuple[List[str], int]:
+    start: int,
+    end: int,
+    column_indices: Sequence[int],
+) -> List[_HgncCandidate]:
     """
-    Extrae los UniProt IDs de los genes del proyecto a partir de HGNC.
+    Filtra las filas HGNC que empiezan en el rango de bytes [start, end).
+
+    Se ejecuta en un proceso aparte: la línea que ya estaba empezada en start
+    pertenece al rango anterior y se descarta. El fichero se proyecta en
+    memoria (mmap) y el rango se decodifica de una vez, sin leerlo línea a
+    línea.
+    """
+    with hgnc_path.open("rb") as fh, \
+            mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        first = mm.find(b"\n", start - 1)
+        last = mm.find(b"\n", end - 1)
+        lo = len(mm) if first == -1 else first + 1
+        hi = len(mm) if last == -1 else last + 1
+        text = mm[lo:hi].decode("utf-8") if lo < hi else ""
+    reader = csv.reader(io.StringIO(text, newline=""), delimiter="\t")
+    return list(_hgnc_candidates(reader, column_indices))
+
+
+def _hgnc_candidates_parallel(
+    hgnc_path: Path,
+    column_indices: Sequence[int],
+    workers: int,
+) -> List[_HgncCandidate]:
+    """
+    Igual que _hgnc_candidates sobre todo el fichero, pero repartiendo las
+    filas en rangos de bytes entre varios procesos. Los resultados se
+    devuelven en el orden del fichero.
+
+    Los procesos se arrancan con 'spawn' y no con fork: el proceso que
+    llama puede tener hilos activos (p. ej. los del pool HTTP), y un fork
+    con hilos en marcha puede bloquearse en los locks que estos tengan.
+    """
+    with hgnc_path.open("rb") as fh:
+        data_start = len(fh.readline())
+    size = hgnc_path.stat().st_size
+    step = max(1, -(-(size - data_start) // workers))
+    bounds = list(range(data_start, size, step)) + [size]
+
+    candidates: List[_HgncCandidate] = []
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = [
+            executor.submit(_scan_hgnc_byte_range, hgnc_path, lo, hi, column_indices)
+            for lo, hi in zip(bounds, bounds[1:])
+        ]
+        for future in futures:
+            candidates.extend(future.result())
+    return candidates
+
 
-    Filtros aplicados:
-        - ensembl_gene_id ∈ project_ensembl_ids (considerando valores múltiples separados por '|')
+def load_hgnc_candidates(hgnc_path: Path, parallel_workers: int = 1) -> List[_HgncCandidate]:
+    """
+    Lee HGNC una sola vez y se queda con las filas que pueden aportar accesos
+    UniProt a cualquier proyecto:
         - locus_group == "protein-coding gene"
         - uniprot_ids no vacío
+        - ensembl_gene_id no vacío
 
-    Devuelve:
-        - lista de accesos UniProt únicos (ordenados)
-        - número de filas escritas en el fichero de mapeo
+    El resultado se filtra después por proyecto con filter_hgnc_for_project,
+    sin volver a leer el fichero. Con parallel_workers > 1 la lectura se
+    reparte por rangos de bytes entre varios procesos; el resultado es el
+    mismo que en serie. Solo compensa con ficheros HGNC mucho mayores que el
+    actual.
     """
-    logger = logging.getLogger("extract_project_uniprot_ids")
+    logger = logging.getLogger("load_hgnc_candidates")
 
     if not hgnc_path.is_file():
         raise FileNotFoundError(f"No se encontró el fichero HGNC: {hgnc_path}")
 
-    mapping_output_path.parent.mkdir(parents=True, exist_ok=True)
+    with hgnc_path.open("r", encoding="utf-8") as fh_in:
+        reader = csv.reader(fh_in, delimiter="\t")
+        fieldnames = next(reader, [])
 
-    unique_accessions: Set[str] = set()
-    n_rows_mapping = 0
+        positions = {name: i for i, name in enumerate(fieldnames)}
+        missing = [col for col in HGNC_REQUIRED_COLUMNS if col not in positions]
+        if missing:
+            raise ValueError(
+                f"El fichero HGNC {hgnc_path} no contiene las columnas requeridas: "
+                f"{', '.join(missing)}."
+            )
 
-    with hgnc_path.open("r", encoding="utf-8") as fh_in, \
-            mapping_output_path.open("w", encoding="utf-8", newline="") as fh_out:
+        column_indices = [positions[col] for col in HGNC_REQUIRED_COLUMNS]
 
-        reader = csv.DictReader(fh_in, delimiter="\t")
-        fieldnames = reader.fieldnames or []
+        if parallel_workers > 1:
+            logger.info("Filtrando HGNC en %d procesos", parallel_workers)
+            candidates = _hgnc_candidates_parallel(hgnc_path, column_indices, parallel_workers)
+        else:
+            candidates = list(_hgnc_candidates(reader, column_indices))
 
-        # Ahora exigimos locus_group (no solo locus_type)
-        required_columns = [
-            "ensembl_gene_id",
-            "hgnc_id",
-            "symbol",
-            "locus_group",
-            "uniprot_ids",
-        ]
-        for col in required_columns:
-            if col not in fieldnames:
-                raise ValueError(
-                    f"El fichero HGNC {hgnc_path} no contiene la columna requerida '{col}'."
-                )
+    logger.info("Genes HGNC codificantes con accesos UniProt: %d", len(candidates))
+    return candidates
 
-        writer = csv.writer(fh_out, delimiter="\t")
-        writer.writerow(["ensembl_gene_id", "hgnc_id", "symbol", "uniprot_id"])
 
-        for row in reader:
-            # 1) Ensembl IDs del gen (posiblemente múltiples separados por '|')
-            ensembl_field = (row.get("ensembl_gene_id") or "").strip()
-            if not ensembl_field:
-                continue
+def build_hgnc_ensembl_index(candidates: Sequence[_HgncCandidate]) -> Dict[str, List[int]]:
+    """
+    Construye un índice Ensembl ID -> posiciones en candidates (ya separados
+    los valores múltiples por '|'). Las posiciones de cada ID quedan en
+    orden creciente.
+    """
+    index: Dict[str, List[int]] = defaultdict(list)
+    for i, (ensembl_ids, _, _, _) in enumerate(candidates):
+        for eid in ensembl_ids:
+            index[eid].append(i)
+    return dict(index)
 
-            row_ensembl_ids = [
-                eid.strip()
-                for eid in ensembl_field.split("|")
-                if eid.strip()
-            ]
-            # Nos quedamos solo con los Ensembl IDs que están en el proyecto
-            matching_ensembl_ids = [
-                eid for eid in row_ensembl_ids if eid in project_ensembl_ids
-            ]
-            if not matching_ensembl_ids:
-                continue
 
-            # 2) Filtro de tipo de locus: usar locus_group, no locus_type
-            locus_group = (row.get("locus_group") or "").strip()
-            if locus_group != "protein-coding gene":
-                continue
+def filter_hgnc_for_project(
+    candidates: Sequence[_HgncCandidate],
+    project_ensembl_ids: AbstractSet[str],
+    mapping_output_path: Path,
+    max_accessions: Optional[int],
+    ensembl_index: Optional[Dict[str, List[int]]] = None,
+) -> Tuple[List[str], int]:
+    """
+    Selecciona de las filas de load_hgnc_candidates las de los genes del
+    proyecto (ensembl_gene_id ∈ project_ensembl_ids, considerando valores
+    múltiples separados por '|') y escribe el fichero de mapeo.
 
-            locus_group = (row.get("locus_type") or "").strip()
-            if locus_group != "gene with protein product":
-                continue
+    Si se pasa ensembl_index (build_hgnc_ensembl_index), solo se visitan las
+    filas de los genes del proyecto en lugar de recorrer todo HGNC; el
+    resultado es el mismo.
+
+    Devuelve:
+        - lista de accesos UniProt únicos, en el orden en que aparecen en
+          HGNC (determinista para un mismo fichero)
+        - número de filas escritas en el fichero de mapeo
+    """
+    logger = logging.getLogger("extract_project_uniprot_ids")
 
+    mapping_output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # 3) Campo UniProt
-            uniprot_field = (row.get("uniprot_ids") or "").strip()
-            if not uniprot_field:
-                continue
+    # dict en lugar de set: conserva el orden de inserción y evita ordenar
+    unique_accessions: Dict[str, None] = {}
+    n_rows_mapping = 0
+    in_project = project_ensembl_ids.__contains__
+
+    if ensembl_index is not None:
+        # Posiciones ordenadas para conservar el orden de HGNC
+        no_rows: List[int] = []
+        row_ids = sorted({
+            i for eid in project_ensembl_ids for i in ensembl_index.get(eid, no_rows)
+        })
+        candidates = [candidates[i] for i in row_ids]
+
+    with mapping_output_path.open(
+        "w", encoding="utf-8", newline="", buffering=OUTPUT_BUFFER_SIZE
+    ) as fh_out:
+        writer = csv.writer(fh_out, delimiter="\t")
+        writer.writerow(["ensembl_gene_id", "hgnc_id", "symbol", "uniprot_id"])
 
-            hgnc_id = (row.get("hgnc_id") or "").strip()
-            symbol = (row.get("symbol") or "").strip()
+        # Las filas de mapeo se acumulan y se vuelcan en bloque con writerows
+        pending_rows: List[Tuple[str, str, str, str]] = []
+        append_row = pending_rows.append
 
-            uniprot_accessions = parse_uniprot_ids_field(uniprot_field)
-            if not uniprot_accessions:
+        for ensembl_ids, hgnc_id, symbol, uniprot_accessions in candidates:
+            # Nos quedamos solo con los Ensembl IDs que están en el proyecto
+            matching_ensembl_ids = [eid for eid in ensembl_ids if in_project(eid)]
+            if not matching_ensembl_ids:
                 continue
 
             for ensembl_id in matching_ensembl_ids:
                 for acc in uniprot_accessions:
                     if max_accessions is not None and len(unique_accessions) >= max_accessions:
                         break
-                    unique_accessions.add(acc)
-                    writer.writerow([ensembl_id, hgnc_id, symbol, acc])
+                    unique_accessions[acc] = None
+                    append_row((ensembl_id, hgnc_id, symbol, acc))
                     n_rows_mapping += 1
 
                 if max_accessions is not None and len(unique_accessions) >= max_accessions:
                     break
 
+            if len(pending_rows) >= MAPPING_FLUSH_ROWS:
+                writer.writerows(pending_rows)
+                pending_rows.clear()
+
             if max_accessions is not None and len(unique_accessions) >= max_accessions:
                 logger.info(
                     "Se alcanzó el máximo configurado de accesos UniProt (%d); "
-                    "se detiene la lectura HGNC.",
+                    "se detiene el filtrado HGNC.",
                     max_accessions,
                 )
                 break
 
-    accessions_sorted = sorted(unique_accessions)
+        writer.writerows(pending_rows)
+
+    accessions = list(unique_accessions)
     logger.info(
         "Accesos UniProt únicos seleccionados para el proyecto: %d (filas de mapeo: %d)",
-        len(accessions_sorted),
+        len(accessions),
         n_rows_mapping,
     )
     logger.info("Fichero de mapeo escrito en: %s", mapping_output_path)
 
-    return accessions_sorted, n_rows_mapping
+    return accessions, n_rows_mapping
+
+
+def extract_project_uniprot_ids(
+    project_ensembl_ids: AbstractSet[str],
+    hgnc_path: Path,
+    mapping_output_path: Path,
+    max_accessions: Optional[int],
+    parallel_workers: int = 1,
+) -> Tuple[List[str], int]:
+    """
+    Extrae los UniProt IDs de los genes del proyecto a partir de HGNC.
+
+    Atajo de load_hgnc_candidates + filter_hgnc_for_project para un único
+    proyecto; con varios, conviene leer HGNC una vez y filtrar por proyecto.
+    """
+    candidates = load_hgnc_candidates(hgnc_path, parallel_workers=parallel_workers)
+    return filter_hgnc_for_project(
+        candidates, project_ensembl_ids, mapping_output_path, max_accessions
+    )
 
 
 
@@ -239,10 +474,13 @@ def extract_project_uniprot_ids(
 def build_uniprot_query(accessions: Sequence[str], cfg: UniProtConfig) -> str:
     """
     Construye la query de UniProt a partir de una lista de accesos y la
-    configuración (organism_id, reviewed_only).
+    configuración (organism_id, reviewed_only). Solo se usa con el endpoint
+    /search; con /accessions los accesos van en su propio parámetro.
+
+    Los accesos se agrupan en un único campo, accession:(A OR B ...), que
+    equivale a repetir accession: en cada término pero acorta la URL.
     """
-    accession_terms = [f"accession:{acc}" for acc in accessions]
-    acc_clause = "(" + " OR ".join(accession_terms) + ")"
+    acc_clause = "accession:(" + " OR ".join(accessions) + ")"
     org_clause = f"organism_id:{cfg.organism_id}"
     clauses = [acc_clause, org_clause]
     if cfg.reviewed_only:
@@ -250,14 +488,162 @@ def build_uniprot_query(accessions: Sequence[str], cfg: UniProtConfig) -> str:
     return " AND ".join(clauses)
 
 
+def uses_accessions_endpoint(cfg: UniProtConfig) -> bool:
+    """True si base_url apunta a /uniprotkb/accessions en lugar de /search."""
+    return cfg.base_url.rstrip("/").endswith("/accessions")
+
+
+def _postfilter_batch(cfg: UniProtConfig, tsv_text: str) -> str:
+    """
+    Aplica organism_id y reviewed_only a una respuesta de /accessions, que no
+    admite query. Usa las columnas 'Organism (ID)' y 'Reviewed' si se han
+    pedido en cfg.fields; si faltan, ese filtro no se aplica. Con /search la
+    respuesta ya viene filtrada y se devuelve tal cual.
+    """
+    if not tsv_text or not uses_accessions_endpoint(cfg):
+        return tsv_text
+    header, _, body = tsv_text.partition("\n")
+    columns = header.rstrip("\r").split("\t")
+    checks = []
+    if "Organism (ID)" in columns:
+        checks.append((columns.index("Organism (ID)"), str(cfg.organism_id)))
+    if cfg.reviewed_only and "Reviewed" in columns:
+        checks.append((columns.index("Reviewed"), "reviewed"))
+    if not checks:
+        return tsv_text
+
+    kept = [header]
+    for line in body.splitlines():
+        fields = line.split("\t")
+        if all(i < len(fields) and fields[i].strip() == value for i, value in checks):
+            kept.append(line)
+    return "\n".join(kept) + "\n"
+
+
+def _retry_wait(cfg: UniProtConfig, attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Segundos de espera antes del siguiente intento: lo que indique
+    Retry-After si el servidor lo envía o, si no, backoff exponencial
+    (sleep_between * 2^(intento-1)) con jitter para no sincronizar los hilos.
+    """
+    wait = parse_retry_after(retry_after)
+    if wait is not None:
+        return wait
+    return cfg.sleep_between * (2 ** (attempt - 1)) + random.uniform(0, cfg.sleep_between)
+
+
+def _batch_cache_path(cfg: UniProtConfig, accessions: Sequence[str]) -> Path:
+    """
+    Ruta en cfg.cache_dir de la respuesta de un lote. La clave es el SHA-256
+    de los accesos ordenados y de los parámetros que cambian el contenido
+    (endpoint, campos, organismo, reviewed_only).
+    """
+    key_src = json.dumps(
+        {
+            "u": cfg.base_url,
+            "a": sorted(accessions),
+            "f": cfg.fields,
+            "o": cfg.organism_id,
+            "r": cfg.reviewed_only,
+        },
+        sort_keys=True,
+    )
+    key = hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+    return Path(cfg.cache_dir).expanduser() / f"{key}.tsv.gz"
+
+
+def _read_batch_cache(cfg: UniProtConfig, cache_path: Path, check_ttl: bool = True) -> Optional[str]:
+    """
+    Devuelve la respuesta cacheada si existe y (con check_ttl) no ha caducado.
+    """
+    try:
+        age = time.time() - cache_path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    if check_ttl and age >= cfg.cache_ttl_seconds:
+        return None
+    return gzip.decompress(cache_path.read_bytes()).decode("utf-8")
+
+
+def _batch_cache_meta_path(cache_path: Path) -> Path:
+    """Fichero con el ETag y Last-Modified de una entrada de la caché."""
+    return cache_path.with_name(cache_path.name + ".meta.json")
+
+
+def _batch_conditional_headers(cache_path: Path) -> Dict[str, str]:
+    """
+    Cabeceras If-None-Match / If-Modified-Since para revalidar una entrada
+    caducada, a partir de los validadores guardados junto a ella.
+    """
+    meta_path = _batch_cache_meta_path(cache_path)
+    if not (cache_path.is_file() and meta_path.is_file()):
+        return {}
+    try:
+        validators = loads_json(meta_path.read_bytes())
+    except (OSError, ValueError):
+        return {}
+    headers: Dict[str, str] = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Escribe path de forma atómica (temporal en el mismo directorio + os.replace)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _write_batch_cache(cache_path: Path, response: requests.Response) -> None:
+    """
+    Guarda la respuesta comprimida y, si el servidor los envía, su ETag y
+    Last-Modified para revalidarla cuando caduque.
+    """
+    _atomic_write_bytes(cache_path, gzip.compress(response.content, compresslevel=6))
+    validators = {
+        key: value
+        for key, value in (
+            ("etag", response.headers.get("ETag")),
+            ("last_modified", response.headers.get("Last-Modified")),
+        )
+        if value
+    }
+    meta_path = _batch_cache_meta_path(cache_path)
+    if validators:
+        _atomic_write_bytes(meta_path, dumps_json_compact(validators))
+    else:
+        meta_path.unlink(missing_ok=True)
+
+
 def fetch_uniprot_batch(
     cfg: UniProtConfig,
     accessions: Sequence[str],
     session: Optional[requests.Session] = None,
+    limiter: Optional[RateLimiter] = None,
+    concurrency: Optional[AdaptiveConcurrency] = None,
 ) -> str:
     """
     Lanza una petición a la API /uniprotkb/search para un conjunto de accesos.
 
+    Si se indica limiter, cada intento (incluidos los reintentos) espera a
+    su turno antes de enviarse. Si se indica concurrency, la petición ocupa
+    un hueco del límite adaptativo y le informa del resultado (éxito o
+    limitación) para que suba o baje el número de peticiones simultáneas.
+
+    Con cfg.cache_dir, la respuesta de cada lote se guarda comprimida en disco
+    y se reutiliza sin ir a la red mientras no supere cfg.cache_ttl_seconds.
+    Una entrada caducada se revalida con una petición condicional
+    (If-None-Match / If-Modified-Since); un 304 la reutiliza sin descargarla.
+
     Devuelve el contenido de la respuesta en formato TSV (texto).
     """
     logger = logging.getLogger("fetch_uniprot_batch")
@@ -265,33 +651,85 @@ def fetch_uniprot_batch(
     if not accessions:
         return ""
 
-    query = build_uniprot_query(accessions, cfg)
-
-    params = {
-        "query": query,
-        "fields": cfg.fields,
-        "format": "tsv",
-        "size": str(len(accessions)),
-    }
+    if uses_accessions_endpoint(cfg):
+        # /uniprotkb/accessions busca directamente por acceso, sin query;
+        # organismo y reviewed se filtran después sobre el TSV
+        params = {
+            "accessions": ",".join(accessions),
+            "fields": cfg.fields,
+            "format": "tsv",
+        }
+    else:
+        params = {
+            "query": build_uniprot_query(accessions, cfg),
+            "fields": cfg.fields,
+            "format": "tsv",
+            "size": str(len(accessions)),
+        }
 
     headers = {
         "User-Agent": "EstandaresDatos-UniProtClient/1.0 (contact: your-email@example.com)"
     }
 
-    sess = session or requests.Session()
+    cache_path: Optional[Path] = None
+    if cfg.cache_dir:
+        cache_path = _batch_cache_path(cfg, accessions)
+        cached = _read_batch_cache(cfg, cache_path)
+        if cached is not None:
+            logger.debug("Lote UniProt leído de caché: %s", cache_path)
+            return _postfilter_batch(cfg, cached)
+        headers.update(_batch_conditional_headers(cache_path))
+
+    sess = session or get_shared_session(max_retries=0)
+
+    # Con lotes grandes la query no cabe en la URL (414 o truncado): en ese
+    # caso se envían los mismos parámetros como formulario en un POST
+    url_length = len(requests.Request("GET", cfg.base_url, params=params).prepare().url)
+    use_post = url_length > MAX_GET_URL_LENGTH
+    if use_post:
+        logger.debug("URL de %d caracteres; se usa POST con formulario", url_length)
 
     for attempt in range(1, cfg.max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
         try:
-            response = sess.get(
-                cfg.base_url,
-                params=params,
-                headers=headers,
-                timeout=cfg.timeout,
-            )
+            with concurrency.slot() if concurrency is not None else contextlib.nullcontext():
+                if use_post:
+                    response = sess.post(
+                        cfg.base_url,
+                        data=params,
+                        headers=headers,
+                        timeout=cfg.timeout,
+                    )
+                else:
+                    response = sess.get(
+                        cfg.base_url,
+                        params=params,
+                        headers=headers,
+                        timeout=cfg.timeout,
+                    )
             if response.status_code == 200:
-                return response.text
+                if concurrency is not None:
+                    if response.headers.get("X-RateLimit-Remaining") == "0":
+                        concurrency.on_throttle()
+                    else:
+                        concurrency.on_success()
+                if cache_path is not None:
+                    _write_batch_cache(cache_path, response)
+                return _postfilter_batch(cfg, response.text)
+
+            if response.status_code == 304 and cache_path is not None:
+                cached = _read_batch_cache(cfg, cache_path, check_ttl=False)
+                if cached is not None:
+                    if concurrency is not None:
+                        concurrency.on_success()
+                    os.utime(cache_path)  # renueva el TTL de la entrada
+                    logger.debug("Lote UniProt sin cambios (304); se reutiliza la caché")
+                    return _postfilter_batch(cfg, cached)
 
             if response.status_code in (429, 503):
+                if concurrency is not None:
+                    concurrency.on_throttle()
                 logger.warning(
                     "Respuesta %s de UniProt (intento %d/%d). Mensaje: %s",
                     response.status_code,
@@ -300,14 +738,21 @@ def fetch_uniprot_batch(
                     response.text,
                 )
                 if attempt < cfg.max_retries:
-                    time.sleep(cfg.sleep_between * attempt)
+                    time.sleep(_retry_wait(cfg, attempt, response.headers.get("Retry-After")))
                     continue
 
+            if response.status_code in (413, 414):
+                raise UniProtBatchTooLargeError(
+                    f"Lote de {len(accessions)} accesos demasiado grande para UniProt "
+                    f"(HTTP {response.status_code})"
+                )
             raise UniProtAPIError(
                 f"Error al consultar UniProt (HTTP {response.status_code}): {response.text}"
             )
 
         except (requests.ConnectionError, requests.Timeout) as exc:
+            if concurrency is not None:
+                concurrency.on_throttle()
             logger.warning(
                 "Error de conexión/timeout con UniProt en intento %d/%d: %s",
                 attempt,
@@ -315,17 +760,187 @@ def fetch_uniprot_batch(
                 exc,
             )
             if attempt < cfg.max_retries:
-                time.sleep(cfg.sleep_between * attempt)
+                time.sleep(_retry_wait(cfg, attempt))
                 continue
             raise UniProtAPIError(f"Error persistente al conectar con UniProt: {exc}") from exc
 
     raise UniProtAPIError("No se pudo obtener respuesta válida de UniProt tras varios reintentos.")
 
 
+def _idmapping_request(
+    sess: requests.Session,
+    cfg: UniProtConfig,
+    method: str,
+    url: str,
+    limiter: Optional[RateLimiter] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    Petición al servicio ID Mapping con los mismos reintentos que los lotes
+    (429/503 y errores de conexión, respetando Retry-After). Si se indica
+    limiter, cada intento espera a tener hueco, como en fetch_uniprot_batch.
+    """
+    logger = logging.getLogger("idmapping")
+
+    for attempt in range(1, cfg.max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = sess.request(method, url, timeout=cfg.timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            logger.warning(
+                "Error de conexión/timeout con UniProt ID Mapping en intento %d/%d: %s",
+                attempt,
+                cfg.max_retries,
+                exc,
+            )
+            if attempt < cfg.max_retries:
+                time.sleep(_retry_wait(cfg, attempt))
+                continue
+            raise UniProtAPIError(f"Error persistente al conectar con UniProt: {exc}") from exc
+
+        if response.status_code in (429, 503) and attempt < cfg.max_retries:
+            response.close()
+            time.sleep(_retry_wait(cfg, attempt, response.headers.get("Retry-After")))
+            continue
+        if response.status_code >= 400:
+            raise UniProtAPIError(
+                f"Error en UniProt ID Mapping (HTTP {response.status_code}): {response.text}"
+            )
+        return response
+
+    raise UniProtAPIError("No se pudo obtener respuesta válida de UniProt ID Mapping.")
+
+
+def _run_idmapping_job(
+    sess: requests.Session,
+    cfg: UniProtConfig,
+    accessions: Sequence[str],
+    limiter: Optional[RateLimiter] = None,
+) -> str:
+    """
+    Lanza un trabajo de ID Mapping (UniProtKB_AC-ID -> UniProtKB) y espera a
+    que termine, consultando su estado con backoff exponencial acotado.
+    Devuelve el identificador del trabajo.
+    """
+    logger = logging.getLogger("idmapping")
+    base = cfg.idmapping_url.rstrip("/")
+
+    response = _idmapping_request(
+        sess,
+        cfg,
+        "POST",
+        f"{base}/run",
+        limiter=limiter,
+        data={"ids": ",".join(accessions), "from": "UniProtKB_AC-ID", "to": "UniProtKB"},
+    )
+    job_id = loads_json(response.content)["jobId"]
+    logger.info("Trabajo de ID Mapping enviado: %s (%d accesos)", job_id, len(accessions))
+
+    deadline = time.monotonic() + IDMAPPING_MAX_WAIT
+    # sleep_between puede ser 0 (solo fija la base de los reintentos): el
+    # sondeo de /status no debe quedarse sin pausa
+    wait = max(cfg.sleep_between, IDMAPPING_MIN_POLL_INTERVAL)
+    while True:
+        # Al terminar, /status redirige a los resultados: no se sigue la
+        # redirección para no descargarlos aquí
+        response = _idmapping_request(
+            sess, cfg, "GET", f"{base}/status/{job_id}", limiter=limiter, allow_redirects=False
+        )
+        if response.is_redirect:
+            response.close()
+            return job_id
+        status = loads_json(response.content or b"{}")
+        job_status = status.get("jobStatus")
+        if job_status is None or job_status == "FINISHED":
+            return job_id
+        if job_status not in ("NEW", "RUNNING"):
+            raise UniProtAPIError(f"El trabajo de ID Mapping {job_id} terminó con estado {job_status}")
+        if time.monotonic() + wait > deadline:
+            raise UniProtAPIError(
+                f"El trabajo de ID Mapping {job_id} no terminó en {IDMAPPING_MAX_WAIT} s"
+            )
+        time.sleep(wait)
+        wait = min(wait * 2, IDMAPPING_MAX_POLL_INTERVAL)
+
+
+def _merge_tsv_batches(first: str, second: str) -> str:
+    """Une dos respuestas TSV conservando una sola cabecera."""
+    if not first:
+        return second
+    if not second:
+        return first
+    body = second.partition("\n")[2]
+    return first + ("" if first.endswith("\n") else "\n") + body
+
+
+def download_uniprot_metadata_idmapping(
+    cfg: UniProtConfig,
+    accessions: Sequence[str],
+    output_path: Path,
+    session: requests.Session,
+) -> int:
+    """
+    Descarga la anotación con el servicio ID Mapping de UniProt: un trabajo
+    por cada IDMAPPING_MAX_IDS accesos y una única descarga en streaming de
+    sus resultados (/idmapping/uniprotkb/results/stream), sin paginar.
+
+    Los resultados de ID Mapping llevan una primera columna 'From' con el
+    acceso de entrada; se elimina para que el TSV tenga las mismas columnas
+    que el de /uniprotkb/search. Devuelve el número de filas escritas.
+    """
+    logger = logging.getLogger("download_uniprot_metadata")
+    base = cfg.idmapping_url.rstrip("/")
+
+    query = f"organism_id:{cfg.organism_id}"
+    if cfg.reviewed_only:
+        query += " AND reviewed:true"
+
+    # Mismo límite de ritmo que las descargas por lotes
+    limiter = RateLimiter(cfg.max_requests_per_minute / 60.0, burst=cfg.max_concurrency)
+
+    header_written = False
+    n_rows_total = 0
+    with output_path.open(
+        "w", encoding="utf-8", newline="", buffering=OUTPUT_BUFFER_SIZE
+    ) as fh_out:
+        for job_accessions in chunked(accessions, IDMAPPING_MAX_IDS):
+            job_id = _run_idmapping_job(session, cfg, job_accessions, limiter=limiter)
+            response = _idmapping_request(
+                session,
+                cfg,
+                "GET",
+                f"{base}/uniprotkb/results/stream/{job_id}",
+                limiter=limiter,
+                params={"fields": cfg.fields, "format": "tsv", "query": query},
+                stream=True,
+            )
+            with response:
+                if response.encoding is None:
+                    response.encoding = "utf-8"
+                lines = response.iter_lines(chunk_size=1 << 16, decode_unicode=True)
+                header = next(lines, None)
+                if header is None:
+                    continue
+                if not header_written:
+                    fh_out.write(header.partition("\t")[2] + "\n")
+                    header_written = True
+                job_rows = 0
+                for line in lines:
+                    if line.strip():
+                        fh_out.write(line.partition("\t")[2] + "\n")
+                        job_rows += 1
+            logger.info("Trabajo de ID Mapping %s: %d filas descargadas", job_id, job_rows)
+            n_rows_total += job_rows
+
+    return n_rows_total
+
+
 def download_uniprot_metadata(
     cfg: UniProtConfig,
     accessions: Sequence[str],
     output_path: Optional[Path] = None,
+    session: Optional[requests.Session] = None,
 ) -> None:
     """
     Descarga anotación UniProt para una lista de accesos y la guarda en un TSV.
@@ -334,6 +949,9 @@ def download_uniprot_metadata(
         cfg: Configuración UniProt
         accessions: Lista de accesos UniProt
         output_path: Path de salida opcional (si no se proporciona, usa cfg.base_output_dir)
+        session: Sesión HTTP a reutilizar entre lotes (si no se proporciona,
+            se usa la sesión compartida del proceso, sin reintentos automáticos
+            porque fetch_uniprot_batch gestiona los suyos)
     """
     logger = logging.getLogger("download_uniprot_metadata")
 
@@ -349,50 +967,133 @@ def download_uniprot_metadata(
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     logger.info("Archivo de salida: %s", output_path)
+
+    if session is None:
+        session = get_shared_session(max_retries=0)
+
+    if cfg.use_idmapping:
+        logger.info(
+            "Descargando metadatos para %d accesos UniProt con ID Mapping...",
+            len(accessions),
+        )
+        n_rows_total = download_uniprot_metadata_idmapping(
+            cfg, accessions, output_path, session
+        )
+        logger.info("✓ Descarga de anotación UniProt completada exitosamente")
+        logger.info("  - Total de filas: %d", n_rows_total)
+        logger.info("  - Archivo guardado: %s", output_path)
+        return
+
+    # /search no devuelve más de MAX_SEARCH_PAGE_SIZE resultados por petición
+    batch_size = cfg.batch_size
+    if not uses_accessions_endpoint(cfg) and batch_size > MAX_SEARCH_PAGE_SIZE:
+        logger.warning(
+            "batch_size=%d supera el máximo de /search (%d); se usa %d",
+            batch_size,
+            MAX_SEARCH_PAGE_SIZE,
+            MAX_SEARCH_PAGE_SIZE,
+        )
+        batch_size = MAX_SEARCH_PAGE_SIZE
+
     logger.info(
         "Descargando metadatos para %d accesos UniProt en lotes de %d...",
         len(accessions),
-        cfg.batch_size
+        batch_size
     )
 
     header_written = False
     n_rows_total = 0
-    n_batches = (len(accessions) + cfg.batch_size - 1) // cfg.batch_size
+    n_batches = (len(accessions) + batch_size - 1) // batch_size
 
-    with output_path.open("w", encoding="utf-8", newline="") as fh_out:
-        session = requests.Session()
+    # Límite de ritmo compartido por todos los hilos: permite una ráfaga de
+    # max_concurrency peticiones y después max_requests_per_minute
+    limiter = RateLimiter(cfg.max_requests_per_minute / 60.0, burst=cfg.max_concurrency)
+    # Ante 429/503 se reduce a la mitad el número de lotes simultáneos y se
+    # recupera poco a poco con las respuestas correctas
+    concurrency = AdaptiveConcurrency(cfg.max_concurrency)
 
-        for i, batch in enumerate(chunked(accessions, cfg.batch_size), start=1):
-            logger.info(
-                "Procesando lote %d/%d (tamaño: %d accesos)...",
-                i,
-                n_batches,
-                len(batch)
+    def _fetch(batch: List[str]) -> str:
+        try:
+            return fetch_uniprot_batch(
+                cfg, batch, session=session, limiter=limiter, concurrency=concurrency
             )
+        except UniProtBatchTooLargeError:
+            if len(batch) == 1:
+                raise
+            # Si UniProt rechaza el lote por tamaño, se parte en dos mitades
+            # y se unen sus respuestas, en lugar de abortar la descarga
+            mid = len(batch) // 2
+            logger.warning(
+                "Lote de %d accesos rechazado por tamaño; se divide en dos", len(batch)
+            )
+            return _merge_tsv_batches(_fetch(batch[:mid]), _fetch(batch[mid:]))
+
+    batches = list(chunked(accessions, batch_size))
+    max_workers = max(1, min(cfg.max_concurrency, n_batches))
+    logger.info("Lotes en paralelo: %d", max_workers)
+
+    # Los lotes se piden en paralelo, pero se escriben en el orden original
+    # para que el TSV de salida sea determinista
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+            output_path.open(
+                "w", encoding="utf-8", newline="", buffering=OUTPUT_BUFFER_SIZE
+            ) as fh_out:
+        futures: List[Optional[Future]] = [
+            executor.submit(_fetch, batch) for batch in batches
+        ]
+        try:
+            for i, batch in enumerate(batches, start=1):
+                tsv_text = futures[i - 1].result()
+                # El futuro ya no hace falta: así el cuerpo del lote se libera
+                # en cuanto se escribe, en lugar de al terminar todos
+                futures[i - 1] = None
+                logger.info(
+                    "Procesando lote %d/%d (tamaño: %d accesos)...",
+                    i,
+                    n_batches,
+                    len(batch)
+                )
 
-            tsv_text = fetch_uniprot_batch(cfg, batch, session=session)
-            if not tsv_text:
-                logger.warning("Lote %d/%d no devolvió datos", i, n_batches)
-                continue
-
-            lines = tsv_text.splitlines()
-            if not lines:
-                continue
-
-            if not header_written:
-                fh_out.write(lines[0] + "\n")
-                header_written = True
-                logger.debug("Cabecera escrita: %s", lines[0][:100])
-
-            batch_rows = 0
-            for line in lines[1:]:
-                if line.strip():
-                    fh_out.write(line + "\n")
-                    n_rows_total += 1
-                    batch_rows += 1
+                if not tsv_text:
+                    logger.warning("Lote %d/%d no devolvió datos", i, n_batches)
+                    continue
 
-            logger.info("Lote %d/%d completado: %d filas descargadas", i, n_batches, batch_rows)
-            time.sleep(cfg.sleep_between)
+                header, _, body = tsv_text.partition("\n")
+                header = header.rstrip("\r")
+                del tsv_text
+
+                if not header_written:
+                    fh_out.write(header + "\n")
+                    header_written = True
+                    logger.debug("Cabecera escrita: %s", header[:100])
+
+                # endpos excluye el salto final, que no abre una línea vacía
+                if (
+                    body
+                    and "\r" not in body
+                    and not _BLANK_LINE.search(body, 0, len(body) - body.endswith("\n"))
+                ):
+                    # Caso habitual: TSV bien formado, se escribe de una vez
+                    fh_out.write(body)
+                    if not body.endswith("\n"):
+                        fh_out.write("\n")
+                    batch_rows = body.count("\n") + (not body.endswith("\n"))
+                else:
+                    # Líneas en blanco o finales \r\n: se recorren sobre el propio
+                    # texto, sin construir una lista con todas las líneas
+                    batch_rows = 0
+                    for line in io.StringIO(body, newline=None):
+                        if line.strip():
+                            fh_out.write(line if line.endswith("\n") else line + "\n")
+                            batch_rows += 1
+                n_rows_total += batch_rows
+
+                logger.info("Lote %d/%d completado: %d filas descargadas", i, n_batches, batch_rows)
+        except BaseException:
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+            raise
 
     logger.info(
         "✓ Descarga de anotación UniProt completada exitosamente"
@@ -405,13 +1106,72 @@ def download_uniprot_metadata(
 # Orquestación
 # ---------------------------------------------------------------------------
 
-def run(app_cfg: AppConfig) -> None:
+def _extract_project_accessions(
+    app_cfg: AppConfig,
+    project_id: str,
+    hgnc_candidates: Sequence[_HgncCandidate],
+    ensembl_index: Optional[Dict[str, List[int]]] = None,
+) -> Tuple[Path, List[str], int]:
+    """
+    Prepara un proyecto para la descarga de UniProt: carga sus genes GDC,
+    filtra las filas HGNC ya leídas (load_hgnc_candidates) y escribe el
+    fichero de mapeo en su subdirectorio.
+
+    Devuelve la ruta del TSV de metadatos del proyecto, los accesos UniProt
+    seleccionados y el número de filas de mapeo.
+    """
+    logger = logging.getLogger("run")
+    uni_cfg = app_cfg.uniprot
+
+    # Build project-specific paths
+    gdc_base_dir = Path(app_cfg.gdc.base_output_dir).expanduser().resolve()
+    project_dir = gdc_base_dir / project_id
+    project_id_lower = project_id.lower().replace("-", "_")
+    project_genes_path = project_dir / f"gdc_genes_{project_id_lower}.tsv"
+
+    # Build UniProt output paths for this project
+    uniprot_base_dir = Path(uni_cfg.base_output_dir).expanduser().resolve()
+    uniprot_project_dir = uniprot_base_dir / project_id
+    uniprot_project_dir.mkdir(parents=True, exist_ok=True)
+
+    mapping_output_path = uniprot_project_dir / f"uniprot_mapping_{project_id_lower}.tsv"
+    metadata_output_path = uniprot_project_dir / f"uniprot_metadata_{project_id_lower}.tsv"
+
+    # Verificar que exista el fichero de genes del proyecto
+    if not project_genes_path.is_file():
+        logger.error("No se encontró el fichero de genes para proyecto %s: %s", project_id, project_genes_path)
+        logger.error("Este archivo se genera al ejecutar: datastandards-download --config <config> --source gdc")
+        raise FileNotFoundError(
+            f"Archivo requerido no encontrado: {project_genes_path}\n"
+            f"Ejecute primero: datastandards-download --config <config> --source gdc"
+        )
+
+    logger.info("Cargando genes del proyecto %s desde: %s", project_id, project_genes_path)
+    project_ensembl_ids = load_project_ensembl_ids(project_genes_path)
+
+    logger.info("Seleccionando accesos UniProt de HGNC para %s", project_id)
+    accessions, n_rows_mapping = filter_hgnc_for_project(
+        hgnc_candidates,
+        project_ensembl_ids,
+        mapping_output_path,
+        max_accessions=uni_cfg.max_accessions,
+        ensembl_index=ensembl_index,
+    )
+    return metadata_output_path, accessions, n_rows_mapping
+
+
+def run(app_cfg: AppConfig, session: Optional[requests.Session] = None) -> None:
     """
     Orquesta el flujo completo de obtención de datos de UniProt para todos
     los proyectos configurados en GDC, usando HGNC como puente.
 
     Multi-project support: Procesa cada proyecto por separado, creando
-    subdirectorios específicos para UniProt data.
+    subdirectorios específicos para UniProt data. HGNC se lee y se filtra
+    una sola vez; cada proyecto solo selecciona sus genes de ese resultado.
+
+    Si se proporciona session, se reutiliza para todas las peticiones de
+    todos los proyectos; si no, se crea aquí una única sesión con tantas
+    conexiones como lotes simultáneos y se cierra al terminar.
     """
     logger = logging.getLogger("run")
 
@@ -424,6 +1184,16 @@ def run(app_cfg: AppConfig) -> None:
         logger.info("Módulo UniProt deshabilitado en la configuración; se omite.")
         return
 
+    if session is None:
+        # Sin reintentos en el adaptador: fetch_uniprot_batch gestiona los
+        # suyos para poder ajustar la concurrencia ante 429/503
+        with create_http_session(
+            pool_connections=1,
+            pool_maxsize=max(1, uni_cfg.max_concurrency),
+            max_retries=0,
+        ) as own_session:
+            return run(app_cfg, session=own_session)
+
     logger.info("=" * 100)
     logger.info("INICIANDO PROCESO DE DESCARGA UNIPROT PARA %d PROYECTO(S)", len(app_cfg.gdc.project_ids))
     logger.info("Proyectos: %s", ", ".join(app_cfg.gdc.project_ids))
@@ -439,45 +1209,24 @@ def run(app_cfg: AppConfig) -> None:
             f"Ejecute primero: datastandards-download --config <config> --source hgnc"
         )
 
+    project_ids = list(app_cfg.gdc.project_ids)
+
+    # HGNC se lee una única vez para todos los proyectos
+    hgnc_workers = (os.cpu_count() or 1) if uni_cfg.parallel_parse else 1
+    logger.info("Leyendo HGNC: %s", hgnc_path)
+    hgnc_candidates = load_hgnc_candidates(hgnc_path, parallel_workers=hgnc_workers)
+    # Con el índice, cada proyecto visita solo las filas de sus genes
+    ensembl_index = build_hgnc_ensembl_index(hgnc_candidates)
+
     # Process each project
-    for project_idx, project_id in enumerate(app_cfg.gdc.project_ids, 1):
+    for project_idx, project_id in enumerate(project_ids, 1):
         logger.info("\n" + "=" * 100)
-        logger.info("PROCESANDO UNIPROT PARA PROYECTO %d/%d: %s", project_idx, len(app_cfg.gdc.project_ids), project_id)
+        logger.info("PROCESANDO UNIPROT PARA PROYECTO %d/%d: %s", project_idx, len(project_ids), project_id)
         logger.info("=" * 100)
 
         try:
-            # Build project-specific paths
-            gdc_base_dir = Path(app_cfg.gdc.base_output_dir).expanduser().resolve()
-            project_dir = gdc_base_dir / project_id
-            project_id_lower = project_id.lower().replace("-", "_")
-            project_genes_path = project_dir / f"gdc_genes_{project_id_lower}.tsv"
-
-            # Build UniProt output paths for this project
-            uniprot_base_dir = Path(uni_cfg.base_output_dir).expanduser().resolve()
-            uniprot_project_dir = uniprot_base_dir / project_id
-            uniprot_project_dir.mkdir(parents=True, exist_ok=True)
-
-            mapping_output_path = uniprot_project_dir / f"uniprot_mapping_{project_id_lower}.tsv"
-            metadata_output_path = uniprot_project_dir / f"uniprot_metadata_{project_id_lower}.tsv"
-
-            # Verificar que exista el fichero de genes del proyecto
-            if not project_genes_path.is_file():
-                logger.error("No se encontró el fichero de genes para proyecto %s: %s", project_id, project_genes_path)
-                logger.error("Este archivo se genera al ejecutar: datastandards-download --config <config> --source gdc")
-                raise FileNotFoundError(
-                    f"Archivo requerido no encontrado: {project_genes_path}\n"
-                    f"Ejecute primero: datastandards-download --config <config> --source gdc"
-                )
-
-            logger.info("Cargando genes del proyecto %s desde: %s", project_id, project_genes_path)
-            project_ensembl_ids = load_project_ensembl_ids(project_genes_path)
-
-            logger.info("Extrayendo accesos UniProt desde HGNC: %s", hgnc_path)
-            accessions, n_rows_mapping = extract_project_uniprot_ids(
-                project_ensembl_ids=project_ensembl_ids,
-                hgnc_path=hgnc_path,
-                mapping_output_path=mapping_output_path,
-                max_accessions=uni_cfg.max_accessions,
+            metadata_output_path, accessions, n_rows_mapping = _extract_project_accessions(
+                app_cfg, project_id, hgnc_candidates, ensembl_index
             )
 
             if not accessions:
@@ -493,7 +1242,9 @@ def run(app_cfg: AppConfig) -> None:
 
             logger.info("Iniciando descarga de metadatos de UniProt para %s...", project_id)
             # Download to project-specific path
-            download_uniprot_metadata(uni_cfg, accessions, output_path=metadata_output_path)
+            download_uniprot_metadata(
+                uni_cfg, accessions, output_path=metadata_output_path, session=session
+            )
 
             logger.info("✓ Proceso UniProt completado para proyecto %s", project_id)
 
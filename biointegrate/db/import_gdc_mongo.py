@@ -10,7 +10,6 @@ Issue: T1 - GDC MongoDB Import Task
 
 import os
 import sys
-import json
 from pathlib import Path
 from typing import Dict, Optional, Any, List
 
@@ -19,6 +18,8 @@ import numpy as np
 from pymongo import MongoClient
 from bson import ObjectId
 
+from biointegrate.utils.json_io import write_json_file
+
 
 def load_manifest(manifest_path: str) -> pd.DataFrame:
     """
@@ -354,8 +355,7 @@ def export_collection_to_json(
             output_file.parent.mkdir(parents=True, exist_ok=True)
 
             # Guardar como JSON
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(documents_serializable, f, indent=2, ensure_ascii=False)
+            write_json_file(documents_serializable, output_file)
 
             if verbose:
                 file_size = output_file.stat().st_size
@@ -398,8 +398,7 @@ def save_documents_as_json(
         output_file.parent.mkdir(parents=True, exist_ok=True)
 
         # Guardar como JSON (array de documentos)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(documents, f, indent=2, ensure_ascii=False)
+        write_json_file(documents, output_file)
 
         if verbose:
             file_size = output_file.stat().st_size
@@ -10,7 +10,6 @@ Issue: #16 - HGNC + GDC Expression Integration
 
 import os
 import sys
-import json
 import math
 from pathlib import Path
 from typing import Dict, Optional, Any, List
@@ -19,6 +18,8 @@ import pandas as pd
 from pymongo import MongoClient
 from bson import ObjectId
 
+from biointegrate.utils.json_io import write_json_file
+
 
 def _none_if_nan(value):
     """Convierte valores NaN a None para compatibilidad con JSON/MongoDB."""
@@ -507,8 +508,7 @@ def export_collection_to_json(
             output_file.parent.mkdir(parents=True, exist_ok=True)
 
             # Guardar como JSON
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(documents_serializable, f, indent=2, ensure_ascii=False)
+            write_json_file(documents_serializable, output_file)
 
             if verbose:
                 file_size = output_file.stat().st_size
@@ -668,8 +668,7 @@ def run_import(
         output_file.parent.mkdir(parents=True, exist_ok=True)
 
         # Guardar como JSON
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(documents, f, indent=2, ensure_ascii=False)
+        write_json_file(documents, output_file)
 
         if verbose:
             file_size = output_file.stat().st_size
@@ -6,7 +6,6 @@ Construye una colección con estructura multi-proyecto:
   uniprot_entries → [entradas UniProt con información por proyecto]
 """
 
-import json
 import math
 import sys
 from pathlib import Path
@@ -16,6 +15,8 @@ import pandas as pd
 from bson import ObjectId
 from pymongo import MongoClient
 
+from biointegrate.utils.json_io import write_json_file
+
 
 def _none_if_nan(value):
     """Devuelve None si el valor es NaN (pandas/numpy), en otro caso lo deja igual."""
@@ -343,8 +344,7 @@ def export_collection_to_json(
             output_file.parent.mkdir(parents=True, exist_ok=True)
 
             # Guardar como JSON
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(documents_serializable, f, indent=2, ensure_ascii=False)
+            write_json_file(documents_serializable, output_file)
 
             if verbose:
                 file_size = output_file.stat().st_size
@@ -387,8 +387,7 @@ def save_documents_as_json(
         output_file.parent.mkdir(parents=True, exist_ok=True)
 
         # Guardar como JSON (array de documentos)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(documents, f, indent=2, ensure_ascii=False)
+        write_json_file(documents, output_file)
 
         if verbose:
             file_size = output_file.stat().st_size
@@ -5,4 +5,4 @@ Este módulo contiene funciones de utilidad para verificar archivos descargados,
 validar datos, y otras operaciones auxiliares.
 """
 
-__all__ = ["check_downloaded_filelength"]
+__all__ = ["check_downloaded_filelength", "http", "json_io"]
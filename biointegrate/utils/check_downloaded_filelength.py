@@ -9,6 +9,7 @@ como número de filas, columnas, tamaño del archivo, etc.
 from __future__ import annotations
 
 import logging
+import mmap
 from pathlib import Path
 from typing import Dict, Any, Optional
 
@@ -86,34 +87,40 @@ def analyze_tsv_file(file_path: Path) -> Dict[str, Any]:
         logger.warning(f"El archivo no existe: {file_path}")
         return result
 
+    if stats["size_bytes"] == 0:
+        # mmap no admite ficheros de longitud cero
+        logger.warning(f"El archivo está vacío: {file_path}")
+        return result
+
     try:
-        with file_path.open("r", encoding="utf-8") as f:
-            lines = f.readlines()
-            
-            if not lines:
-                logger.warning(f"El archivo está vacío: {file_path}")
-                return result
-            
+        # Se recorre el fichero mapeado en memoria línea a línea (en bytes):
+        # no se decodifica ni se carga el TSV completo en memoria.
+        with file_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = iter(mm.readline, b"")
+
             # Buscar la línea de cabecera (primera línea que no es comentario)
-            header_idx = 0
+            header_line = b""
             for i, line in enumerate(lines):
-                if not line.strip().startswith("#"):
-                    header_idx = i
+                if i == 0:
+                    header_line = line
+                if not line.strip().startswith(b"#"):
+                    header_line = line
                     break
-            
+
             # Primera línea no comentario como cabecera
-            header = lines[header_idx].strip()
+            header = header_line.decode("utf-8").strip()
             if header:
                 result["has_header"] = True
                 result["columns"] = header.split("\t")
                 result["num_columns"] = len(result["columns"])
-            
+
             # Contar filas de datos (sin incluir cabecera ni comentarios)
-            data_lines = [
-                line for line in lines[header_idx + 1:]
-                if line.strip() and not line.strip().startswith("#")
-            ]
-            result["num_rows"] = len(data_lines)
+            num_rows = 0
+            for line in lines:
+                stripped = line.strip()
+                if stripped and not stripped.startswith(b"#"):
+                    num_rows += 1
+            result["num_rows"] = num_rows
             
     except Exception as e:
         logger.error(f"Error al analizar el archivo {file_path}: {e}")
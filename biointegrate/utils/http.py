@@ -0,0 +1,241 @@
+"""
+Utilidades HTTP compartidas por los módulos de descarga (GDC, HGNC, UniProt).
+
+Centraliza la creación de sesiones ``requests`` con pool de conexiones
+(keep-alive) y reintentos automáticos ante errores transitorios, de forma
+que varias peticiones al mismo host reutilicen la conexión TCP/TLS.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+# Códigos HTTP que se consideran transitorios y se reintentan
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Métodos que se reintentan. Además de los idempotentes por defecto se
+# incluye POST: en este proyecto solo se usa para consultas de solo lectura
+# a /files y /genes del GDC, que pueden repetirse sin efectos secundarios.
+RETRY_METHODS = Retry.DEFAULT_ALLOWED_METHODS | frozenset(["POST"])
+
+# Tamaño de bloque al volcar descargas grandes (HGNC, /data del GDC) a
+# disco: 1 MiB reduce las iteraciones en Python frente a los 8 KiB habituales
+STREAM_CHUNK_SIZE = 1 << 20
+
+# Codificaciones que urllib3 sabe descomprimir en este entorno: gzip y
+# deflate siempre; br solo si está instalado 'brotli' (extra 'speedups').
+# Anunciar br sin el decodificador produciría respuestas ilegibles.
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+
+class RateLimiter:
+    """
+    Limitador de peticiones por segundo basado en time.monotonic().
+
+    Reparte las peticiones a intervalos regulares de 1/requests_per_second
+    segundos; es seguro entre hilos, de modo que las descargas en paralelo
+    comparten la misma cuota. Con burst > 1 funciona como un cubo con fugas
+    (leaky bucket): tras un periodo de inactividad se dejan pasar hasta
+    burst peticiones seguidas y solo después se espacian.
+    """
+
+    def __init__(self, requests_per_second: float, burst: int = 1) -> None:
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second debe ser mayor que 0")
+        self._interval = 1.0 / requests_per_second
+        # Crédito máximo acumulable (en segundos) para ráfagas
+        self._max_credit = self._interval * (max(1, burst) - 1)
+        self._next_slot = time.monotonic() - self._max_credit
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloquea hasta que la siguiente petición pueda enviarse."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now - self._max_credit)
+            self._next_slot = slot + self._interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AdaptiveConcurrency:
+    """
+    Límite de peticiones simultáneas que se ajusta con la respuesta del
+    servidor (AIMD): sube 0.5 con cada éxito y se reduce a la mitad ante
+    un 429/503 o un error de conexión, entre min_concurrency y
+    max_concurrency. Es seguro entre hilos.
+    """
+
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1) -> None:
+        self._max = float(max(1, max_concurrency))
+        self._min = float(max(1, min(min_concurrency, max_concurrency)))
+        self._limit = self._max
+        self._active = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Número de peticiones simultáneas permitidas ahora mismo."""
+        return int(self._limit)
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[None]:
+        """Ocupa un hueco durante la petición, esperando si no hay ninguno libre."""
+        with self._cond:
+            while self._active >= int(self._limit):
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def on_success(self) -> None:
+        """Incremento aditivo tras una respuesta correcta."""
+        with self._cond:
+            self._limit = min(self._max, self._limit + 0.5)
+            self._cond.notify_all()
+
+    def on_throttle(self) -> None:
+        """Reducción multiplicativa ante limitación o error del servidor."""
+        with self._cond:
+            self._limit = max(self._min, self._limit * 0.5)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Convierte una cabecera Retry-After (segundos o fecha HTTP) en segundos
+    de espera. Devuelve None si no está presente o no se puede interpretar.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class _RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter que espera al RateLimiter antes de cada envío."""
+
+    def __init__(self, limiter: RateLimiter, **kwargs) -> None:
+        self._limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):  # type: ignore[override]
+        self._limiter.acquire()
+        return super().send(request, **kwargs)
+
+
+def create_http_session(
+    pool_connections: int = 8,
+    pool_maxsize: int = 16,
+    max_retries: int = 8,
+    backoff_factor: float = 1.0,
+    requests_per_second: Optional[float] = None,
+) -> requests.Session:
+    """
+    Crea una sesión HTTP con pool de conexiones y reintentos.
+
+    Parameters
+    ----------
+    pool_connections : int
+        Número de pools (hosts distintos) que se mantienen en caché.
+    pool_maxsize : int
+        Conexiones máximas por host que se reutilizan.
+    max_retries : int
+        Reintentos ante errores de conexión o códigos RETRY_STATUS_CODES.
+    backoff_factor : float
+        Factor de espera exponencial entre reintentos (segundos).
+    requests_per_second : float, optional
+        Si se indica, limita el ritmo de peticiones de la sesión (todos los
+        hilos comparten la cuota). None desactiva el límite.
+
+    Returns
+    -------
+    requests.Session
+        Sesión lista para usar; el llamador es responsable de cerrarla.
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=RETRY_METHODS,
+        # Tras agotar los reintentos se devuelve la última respuesta para
+        # que el llamador la gestione (raise_for_status, mensajes propios...)
+        raise_on_status=False,
+        # Ante 429/503 el servidor indica cuánto esperar; se respeta antes
+        # que el backoff exponencial
+        respect_retry_after_header=True,
+    )
+    adapter_kwargs = dict(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+    if requests_per_second:
+        adapter: HTTPAdapter = _RateLimitedAdapter(
+            RateLimiter(requests_per_second), **adapter_kwargs
+        )
+    else:
+        adapter = HTTPAdapter(**adapter_kwargs)
+    session = requests.Session()
+    # Las respuestas TSV/JSON se comprimen muy bien; iter_content y .text
+    # las devuelven ya descomprimidas
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Sesiones compartidas por proceso, una por política de reintentos
+_SHARED_SESSIONS: Dict[int, requests.Session] = {}
+_SHARED_SESSIONS_LOCK = threading.Lock()
+
+
+def get_shared_session(max_retries: int = 8) -> requests.Session:
+    """
+    Devuelve la sesión HTTP compartida del proceso, creándola si no existe.
+
+    Los módulos de descarga la usan cuando el llamador no pasa una sesión
+    propia, de modo que GDC, HGNC y UniProt reutilizan el mismo pool de
+    conexiones durante toda la ejecución. Se cierra automáticamente al
+    salir del intérprete.
+
+    Parameters
+    ----------
+    max_retries : int
+        Reintentos automáticos de la sesión. Los módulos con bucle de
+        reintentos propio (UniProt) piden 0 para no multiplicarlos.
+
+    Returns
+    -------
+    requests.Session
+        Sesión compartida; el llamador no debe cerrarla.
+    """
+    session = _SHARED_SESSIONS.get(max_retries)
+    if session is None:
+        with _SHARED_SESSIONS_LOCK:
+            session = _SHARED_SESSIONS.get(max_retries)
+            if session is None:
+                session = create_http_session(max_retries=max_retries)
+                atexit.register(session.close)
+                _SHARED_SESSIONS[max_retries] = session
+    return session
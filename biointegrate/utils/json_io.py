@@ -0,0 +1,133 @@
+"""
+Utilidades de serialización JSON para los ficheros exportados por el proyecto.
+
+Si ``orjson`` está instalado (extra opcional ``speedups``) se usa para
+serializar y para parsear respuestas, ya que es varias veces más rápido que
+``json`` con colecciones grandes. En caso contrario, o si el objeto contiene tipos que orjson no
+sabe serializar, se recurre a la librería estándar con el mismo formato
+(indentación de 2 espacios y UTF-8 sin escapar).
+
+Los tipos que solo orjson sabe serializar (datetime, dataclasses, numpy,
+subclases de tipos básicos) se delegan siempre en ``json``, de modo que se
+aceptan o se rechazan igual con o sin orjson. Quedan dos diferencias:
+
+- Los floats no finitos (NaN, Infinity) se escriben como ``null`` con
+  orjson y como ``NaN``/``Infinity`` (JSON no estándar) con ``json``. Los
+  importadores de Mongo ya convierten los NaN de pandas a None antes de
+  exportar.
+- Los floats con exponente se formatean distinto (``1e16`` frente a
+  ``1e+16``); el valor leído es el mismo.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None  # type: ignore[assignment]
+    _ORJSON_PASSTHROUGH = 0
+else:
+    # Estos tipos llegan a default (ausente) y provocan TypeError, así que se
+    # serializan con json igual que sin orjson
+    _ORJSON_PASSTHROUGH = (
+        orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_SUBCLASS
+    )
+
+
+def dumps_json_bytes(obj: Any) -> bytes:
+    """
+    Serializa un objeto a JSON (bytes UTF-8) con indentación de 2 espacios.
+
+    Parameters
+    ----------
+    obj : Any
+        Objeto serializable a JSON.
+
+    Returns
+    -------
+    bytes
+        Documento JSON codificado en UTF-8.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | _ORJSON_PASSTHROUGH,
+            )
+        except TypeError:
+            # orjson.JSONEncodeError hereda de TypeError; se reintenta con json
+            pass
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def dumps_json_compact(obj: Any) -> bytes:
+    """
+    Serializa un objeto a JSON compacto (bytes UTF-8), p. ej. para el cuerpo
+    de una petición HTTP.
+
+    Parameters
+    ----------
+    obj : Any
+        Objeto serializable a JSON.
+
+    Returns
+    -------
+    bytes
+        Documento JSON sin espacios, codificado en UTF-8.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_PASSTHROUGH)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads_json(data: bytes | str) -> Any:
+    """
+    Parsea un documento JSON (p. ej. ``response.content`` de requests).
+
+    Con orjson se parsean directamente los bytes, sin decodificarlos antes
+    a ``str``.
+
+    Parameters
+    ----------
+    data : bytes | str
+        Documento JSON.
+
+    Returns
+    -------
+    Any
+        Objeto Python resultante.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_json_file(obj: Any, output_path: str | Path) -> Path:
+    """
+    Escribe un objeto como fichero JSON, creando los directorios intermedios.
+
+    Parameters
+    ----------
+    obj : Any
+        Objeto serializable a JSON.
+    output_path : str | Path
+        Ruta del fichero de salida.
+
+    Returns
+    -------
+    Path
+        Ruta del fichero escrito.
+    """
+    output_file = Path(output_path)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_bytes(dumps_json_bytes(obj))
+    return output_file